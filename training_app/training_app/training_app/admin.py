@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth.models import Group
-from .models import User, Training, TrainingType, Diet
+from .models import User, Training, TrainingType, Diet, TrainingMetrics, GpxJob, ZoneProfile, WeeklyLoad, TrainingSamples
 
 class UserAdmin(BaseUserAdmin):
     fieldsets = (
@@ -34,7 +34,34 @@ class DietAdmin(admin.ModelAdmin):
     search_fields = ('training_type__training_type',)
     list_filter = ('training_type',)
 
+class TrainingMetricsAdmin(admin.ModelAdmin):
+    list_display = ('training', 'avg_hr', 'max_hr', 'min_hr', 'duration', 'computed_at')
+    search_fields = ('training__competitor__username',)
+
+class GpxJobAdmin(admin.ModelAdmin):
+    list_display = ('training', 'status', 'created_at', 'started_at', 'finished_at')
+    list_filter = ('status',)
+
+class ZoneProfileAdmin(admin.ModelAdmin):
+    list_display = ('user', 'method', 'max_hr', 'resting_hr', 'updated_at')
+    list_filter = ('method',)
+    search_fields = ('user__username', 'user__surname')
+
+class WeeklyLoadAdmin(admin.ModelAdmin):
+    list_display = ('competitor', 'week', 'sessions', 'duration', 'trimp')
+    list_filter = ('week',)
+    search_fields = ('competitor__username', 'competitor__surname')
+
+class TrainingSamplesAdmin(admin.ModelAdmin):
+    list_display = ('training', 'sample_count', 'content_hash', 'created_at')
+    search_fields = ('training__competitor__username', 'content_hash')
+
 admin.site.register(User, UserAdmin)
 admin.site.register(Training, TrainingAdmin)
 admin.site.register(TrainingType, TrainingTypeAdmin)
 admin.site.register(Diet, DietAdmin)
+admin.site.register(TrainingMetrics, TrainingMetricsAdmin)
+admin.site.register(GpxJob, GpxJobAdmin)
+admin.site.register(ZoneProfile, ZoneProfileAdmin)
+admin.site.register(WeeklyLoad, WeeklyLoadAdmin)
+admin.site.register(TrainingSamples, TrainingSamplesAdmin)
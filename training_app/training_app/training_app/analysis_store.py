@@ -0,0 +1,41 @@
+import secrets
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+def _store():
+    return caches[settings.ANALYSIS_STORE_CACHE]
+
+
+def _key(token):
+    return f'analysis:{token}'
+
+
+def store_analysis(gpx_url, samples, content_hash, age=None):
+    """
+    Zapisuje przetworzone punkty śladu po stronie serwera i zwraca krótki token do sesji.
+    ``age`` to wiek podany przy podglądzie - zapis treningu liczy strefy tak samo.
+    """
+    token = secrets.token_urlsafe(12)
+    entry = {'gpx_url': gpx_url, 'samples': samples, 'content_hash': content_hash, 'age': age}
+    _store().set(_key(token), entry, settings.ANALYSIS_STORE_TTL)
+    return token
+
+
+def load_analysis(token, gpx_url=None):
+    """
+    Zwraca słownik z punktami (``samples``), hashem pliku GPX (``content_hash``)
+    i wiekiem z podglądu (``age``) albo ``None``, jeśli token wygasł lub dotyczy innego pliku GPX.
+    """
+    if not token:
+        return None
+    entry = _store().get(_key(token))
+    if entry is None or (gpx_url is not None and entry['gpx_url'] != gpx_url):
+        return None
+    return entry
+
+
+def discard_analysis(token):
+    if token:
+        _store().delete(_key(token))
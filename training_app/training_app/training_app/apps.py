@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+class TrainingAppConfig(AppConfig):
+    name = 'training_app'
+
+    def ready(self):
+        from . import signals
+
+        # tabela FTS5 nie jest modelem, więc zakładamy ją po migracjach
+        post_migrate.connect(signals.create_search_table, sender=self)
@@ -0,0 +1,127 @@
+import numpy as np
+from bokeh.models import ColumnDataSource, HoverTool, LinearColorMapper, Range1d
+from bokeh.plotting import figure
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .downsampling import lttb_indices
+from .profiling import profile_section
+from .zones import ZONE_COLORS, format_zones_boundaries
+
+
+def downsample_hr_series(heart_rates, classification, time_indices=None, max_points=None):
+    """Zwraca ``(czas w minutach, tętno, strefa)`` zmniejszone metodą LTTB do ``max_points`` punktów."""
+    heart_rates = np.asarray(heart_rates)
+    if time_indices is None:
+        time_indices = np.arange(len(heart_rates)) / 60
+    if max_points is None:
+        max_points = settings.HR_CHART_MAX_POINTS
+
+    with profile_section('numpy'):
+        indices = lttb_indices(time_indices, heart_rates, max_points)
+    # float32 wystarcza dla minut, a kolumny zajmują o połowę mniej w osadzonym dokumencie
+    time_indices = np.asarray(time_indices, dtype=np.float32)[indices]
+    return time_indices, heart_rates[indices], classification.zones[indices]
+
+
+def create_hr_line_chart(heart_rates, classification, time_indices=None, max_points=None):
+    """
+    Wykres tętna w czasie. Cały przebieg to jeden glif ``segment`` z kolumną
+    strefy mapowaną na kolor, więc liczba rendererów nie zależy od liczby
+    zmian stref. Przebieg jest zmniejszany metodą LTTB do ``max_points``
+    punktów (domyślnie ``settings.HR_CHART_MAX_POINTS``); czasy w strefach
+    liczy się wcześniej, na pełnych danych.
+    """
+    heart_rates = np.asarray(heart_rates)
+    min_hr = int(heart_rates.min()) if heart_rates.size else 0
+    max_hr = int(heart_rates.max()) if heart_rates.size else 0
+    time_indices, heart_rates, zones = downsample_hr_series(heart_rates, classification, time_indices, max_points)
+
+    source = ColumnDataSource(data=dict(
+        x0=time_indices[:-1],
+        y0=heart_rates[:-1],
+        x1=time_indices[1:],
+        y1=heart_rates[1:],
+        zone=zones[:-1],
+    ))
+    color_mapper = LinearColorMapper(palette=ZONE_COLORS, low=-0.5, high=len(ZONE_COLORS) - 0.5)
+
+    p = figure(title='Tętno w czasie z podziałem na strefy', x_axis_label='Czas[min]', y_axis_label='Tętno [bpm]',
+               sizing_mode='stretch_width', height=400, y_range=Range1d(start=min_hr, end=max_hr))
+    p.segment(x0='x0', y0='y0', x1='x1', y1='y1', line_width=2,
+              color={'field': 'zone', 'transform': color_mapper}, source=source)
+    hover = HoverTool(
+        tooltips=[
+            ("Czas", "$x{0.2f} min"),
+            ("Tętno", "$y bpm"),
+        ],
+        mode='vline'
+    )
+    p.add_tools(hover)
+
+    return p
+
+
+def create_zone_time_chart(zone_times, **figure_kwargs):
+    zone_labels = [str(i) for i in range(1, len(zone_times) + 1)]
+
+    # sekundy na minuty
+    zone_times_in_minutes = [time / 60 for time in zone_times]
+
+    source = ColumnDataSource(data=dict(zones=zone_labels, times=zone_times_in_minutes, colors=ZONE_COLORS[:len(zone_times)]))
+
+    p = figure(x_range=zone_labels, title="Czas spędzony w strefach tętna", height=400, toolbar_location=None, tools="",
+               **figure_kwargs)
+    p.vbar(x='zones', top='times', width=0.9, color='colors', source=source)
+    hover = HoverTool(
+            tooltips=[
+                ("Strefa", "@zones"),
+                ("Czas", "@times min"),
+            ]
+    )
+    p.add_tools(hover)
+
+    p.xgrid.grid_line_color = None
+    p.y_range.start = 0
+    p.xaxis.axis_label = "Strefy tętna"
+    p.yaxis.axis_label = "Czas [min]"
+
+    return p
+
+
+def hr_chart_data(heart_rates, classification, zone_times, max_points=None):
+    """
+    Dane wykresów w postaci zwartego JSON-a dla renderowania po stronie
+    przeglądarki (BokehJS): zmniejszony przebieg tętna z numerami stref
+    oraz czasy w strefach liczone na pełnych danych.
+    """
+    heart_rates = np.asarray(heart_rates)
+    time_indices, sampled_hr, zones = downsample_hr_series(heart_rates, classification, max_points=max_points)
+    return {
+        't': np.round(time_indices.astype(np.float64), 2).tolist(),
+        'hr': sampled_hr.tolist(),
+        'zone': zones.tolist(),
+        'min_hr': int(heart_rates.min()) if heart_rates.size else 0,
+        'max_hr': int(heart_rates.max()) if heart_rates.size else 0,
+        'zone_times': list(zone_times),
+        'colors': ZONE_COLORS,
+    }
+
+
+def chart_cache_key(training_id, content_hash, zones_boundaries, max_points=None):
+    if max_points is None:
+        max_points = settings.HR_CHART_MAX_POINTS
+    return f'charts:{training_id}:{content_hash}:{format_zones_boundaries(zones_boundaries)}:{max_points}'
+
+
+def chart_data_cache_key(training_id, content_hash, zones_boundaries, max_points=None):
+    return 'data:' + chart_cache_key(training_id, content_hash, zones_boundaries, max_points)
+
+
+def get_cached_charts(cache_key):
+    return caches[settings.CHART_CACHE].get(cache_key)
+
+
+def set_cached_charts(cache_key, charts):
+    caches[settings.CHART_CACHE].set(cache_key, charts, settings.CHART_CACHE_TTL)
@@ -0,0 +1,119 @@
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Case, Count, IntegerField, Sum, Value, When
+from django.db.models.functions import TruncWeek
+from django.utils import timezone
+
+from .models import Training, TrainingType
+from .weekly_load import load_trend, week_start
+
+# odczucia są zapisywane jako tekst; do trendu zamieniamy je na skalę 1-6
+FEELING_SCORES = {
+    'Bardzo źle': 1,
+    'Źle': 2,
+    'Neutralnie': 3,
+    'Dobrze': 4,
+    'Bardzo dobrze': 5,
+    'Perfekcyjnie': 6,
+}
+
+TRAINING_TYPE_LABELS = dict(TrainingType.TRAINING_CHOICES)
+
+
+def feeling_score():
+    return Case(
+        *[When(feeling=text, then=Value(score)) for text, score in FEELING_SCORES.items()],
+        output_field=IntegerField(),
+    )
+
+
+def weekly_rows(coach, date_from, date_to):
+    """
+    Jedno zapytanie grupujące treningi trenera po zawodniku, tygodniu i rodzaju
+    treningu. Każdy wiersz ma liczbę treningów, łączny czas z metryk GPX oraz
+    sumę i liczbę ocen odczuć (do średniej).
+    """
+    score = feeling_score()
+    return (
+        Training.objects.filter(coach=coach, date__gte=date_from, date__lte=date_to)
+        .annotate(week=TruncWeek('date'))
+        .values('competitor_id', 'competitor__name', 'competitor__surname', 'week', 'training_type__training_type')
+        .annotate(
+            sessions=Count('id'),
+            duration=Sum('metrics__duration'),
+            feeling_sum=Sum(score),
+            feeling_count=Count(score),
+        )
+        .order_by('competitor__surname', 'competitor__name', 'competitor_id', 'week')
+    )
+
+
+def coach_dashboard(coach, date_from=None, date_to=None):
+    """
+    Tygodniowa objętość, rozkład rodzajów treningów, trend odczuć i
+    obciążenie (ACWR) dla każdego zawodnika trenera. Bez zakresu dat obejmuje ostatnie
+    ``COACH_DASHBOARD_WEEKS`` tygodni.
+    """
+    if date_to is None:
+        date_to = timezone.localdate()
+    if date_from is None:
+        date_from = week_start(date_to) - timedelta(weeks=settings.COACH_DASHBOARD_WEEKS - 1)
+
+    weeks = []
+    week = week_start(date_from)
+    while week <= date_to:
+        weeks.append(week)
+        week += timedelta(weeks=1)
+
+    competitors = {}
+    for row in weekly_rows(coach, date_from, date_to):
+        competitor = competitors.get(row['competitor_id'])
+        if competitor is None:
+            competitor = competitors[row['competitor_id']] = {
+                'id': row['competitor_id'],
+                'name': f"{row['competitor__name']} {row['competitor__surname']}".strip(),
+                'by_week': defaultdict(lambda: {'sessions': 0, 'duration': 0, 'feeling_sum': 0, 'feeling_count': 0}),
+                'types': Counter(),
+            }
+        totals = competitor['by_week'][row['week']]
+        totals['sessions'] += row['sessions']
+        totals['duration'] += row['duration'] or 0
+        totals['feeling_sum'] += row['feeling_sum'] or 0
+        totals['feeling_count'] += row['feeling_count']
+        label = TRAINING_TYPE_LABELS.get(row['training_type__training_type'], 'Brak')
+        competitor['types'][label] += row['sessions']
+
+    result = []
+    for competitor in competitors.values():
+        by_week = competitor.pop('by_week')
+        # tygodnie bez treningów dostają zerowe wartości z defaultdict
+        competitor['weeks'] = [
+            {
+                'week': week,
+                'sessions': by_week[week]['sessions'],
+                'duration_min': round(by_week[week]['duration'] / 60),
+                'feeling': _average(by_week[week]['feeling_sum'], by_week[week]['feeling_count']),
+            }
+            for week in weeks
+        ]
+        competitor['sessions'] = sum(totals['sessions'] for totals in by_week.values())
+        competitor['feeling'] = _average(
+            sum(totals['feeling_sum'] for totals in by_week.values()),
+            sum(totals['feeling_count'] for totals in by_week.values()),
+        )
+        competitor['types'] = dict(competitor['types'].most_common())
+        result.append(competitor)
+
+    # obciążenie (TRIMP, ACWR) z tabeli WeeklyLoad - kilkanaście wierszy na zawodnika
+    trend = load_trend([competitor['id'] for competitor in result], weeks[0], weeks[-1]) if weeks else {}
+    for competitor in result:
+        competitor['load'] = trend.get(competitor['id'], [])
+        competitor['acwr'] = competitor['load'][-1]['acwr'] if competitor['load'] else None
+
+    return {'date_from': date_from, 'date_to': date_to, 'weeks': weeks, 'competitors': result}
+
+
+def _average(total, count):
+    return round(total / count, 1) if count else None
@@ -0,0 +1,36 @@
+import numpy as np
+
+
+def lttb_indices(x, y, threshold):
+    """
+    Indeksy punktów wybranych algorytmem Largest-Triangle-Three-Buckets.
+    Pierwszy i ostatni punkt zostają zawsze; z każdego kubełka wybierany jest
+    punkt tworzący największy trójkąt z poprzednio wybranym punktem i średnią
+    następnego kubełka, dzięki czemu szczyty nie znikają z wykresu.
+    """
+    n = len(x)
+    if threshold is None or threshold < 3 or n <= threshold:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.intp)
+    edges[-1] = n - 1
+
+    indices = np.empty(threshold, dtype=np.intp)
+    indices[0] = 0
+    indices[-1] = n - 1
+    selected = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_end = edges[bucket + 2] if bucket + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+
+        areas = np.abs(
+            (x[selected] - avg_x) * (y[start:end] - y[selected])
+            - (x[selected] - x[start:end]) * (avg_y - y[selected])
+        )
+        selected = start + int(np.argmax(areas))
+        indices[bucket + 1] = selected
+    return indices
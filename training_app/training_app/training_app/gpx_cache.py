@@ -0,0 +1,242 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+import weakref
+from pathlib import Path
+
+import httpx
+import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .profiling import profile_section
+
+
+class GpxCache:
+    """
+    Lokalny magazyn plików GPX adresowany treścią.
+
+    Treść pliku trafia do ``blobs/<sha256 treści>.gpx``, a ``index/<sha256 url>.json``
+    przechowuje hash treści oraz nagłówki ETag/Last-Modified potrzebne do
+    warunkowego pobrania. Rozmiar katalogu ``blobs`` jest ograniczony (LRU po mtime).
+    """
+
+    def __init__(self, directory, max_bytes, max_age):
+        self.directory = Path(directory)
+        self.blobs_dir = self.directory / 'blobs'
+        self.index_dir = self.directory / 'index'
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+
+    def _index_path(self, url):
+        return self.index_dir / f'{hashlib.sha256(url.encode("utf-8")).hexdigest()}.json'
+
+    def blob_path(self, content_hash):
+        return self.blobs_dir / f'{content_hash}.gpx'
+
+    def lookup(self, url):
+        try:
+            with open(self._index_path(url), encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not self.blob_path(entry['content_hash']).exists():
+            return None
+        return entry
+
+    def is_fresh(self, entry):
+        return time.time() - entry['fetched_at'] < self.max_age
+
+    def conditional_headers(self, entry):
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def touch(self, url, entry, revalidated=False):
+        """Odświeża mtime kopii (LRU); ``None``, gdy plik zdążył usunąć ``evict`` innego procesu."""
+        path = self.blob_path(entry['content_hash'])
+        try:
+            os.utime(path)
+        except OSError:
+            return None
+        if revalidated:
+            entry['fetched_at'] = time.time()
+            self._write_index(url, entry)
+        return path
+
+    def store(self, url, content, headers):
+        content_hash = hashlib.sha256(content).hexdigest()
+        path = self.blob_path(content_hash)
+        if path.exists():
+            os.utime(path)
+        else:
+            self.blobs_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(f'.{os.getpid()}.tmp')
+            tmp_path.write_bytes(content)
+            os.replace(tmp_path, path)
+        self._write_index(url, {
+            'url': url,
+            'content_hash': content_hash,
+            'etag': headers.get('ETag'),
+            'last_modified': headers.get('Last-Modified'),
+            'fetched_at': time.time(),
+        })
+        self.evict()
+        return path
+
+    def _write_index(self, url, entry):
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        path = self._index_path(url)
+        tmp_path = path.with_suffix(f'.{os.getpid()}.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+
+    def evict(self):
+        blobs = []
+        for path in self.blobs_dir.glob('*.gpx'):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            blobs.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in blobs)
+        removed = False
+        # najdawniej używane pliki usuwamy jako pierwsze
+        for _, size, path in sorted(blobs, key=lambda blob: blob[0]):
+            if total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= size
+            removed = True
+        if removed:
+            self._evict_index()
+
+    def _evict_index(self):
+        # wpisy indeksu wskazujące usunięte pliki nie są już potrzebne
+        for path in self.index_dir.glob('*.json'):
+            try:
+                with open(path, encoding='utf-8') as f:
+                    content_hash = json.load(f)['content_hash']
+            except (OSError, ValueError, KeyError):
+                continue
+            if not self.blob_path(content_hash).exists():
+                try:
+                    path.unlink()
+                except OSError:
+                    continue
+
+
+gpx_cache = GpxCache(settings.GPX_CACHE_DIR, settings.GPX_CACHE_MAX_BYTES, settings.GPX_CACHE_MAX_AGE)
+
+
+_session = requests.Session()
+
+
+def _cached_or_none(url, entry):
+    # gdy serwer nie odpowiada, lepsza nieco starsza kopia niż brak wykresu
+    return gpx_cache.touch(url, entry) if entry is not None else None
+
+
+def _handle_response(url, entry, status_code, content, headers):
+    if status_code == 304 and entry is not None:
+        return gpx_cache.touch(url, entry, revalidated=True)
+    if status_code == 200:
+        return gpx_cache.store(url, content, headers)
+    if status_code >= 500:
+        return _cached_or_none(url, entry)
+    return None
+
+
+def _cached_copy(url):
+    """Aktualna kopia z cache albo ``(None, wpis do warunkowego pobrania)``."""
+    entry = gpx_cache.lookup(url)
+    if entry is not None and gpx_cache.is_fresh(entry):
+        path = gpx_cache.touch(url, entry)
+        if path is not None:
+            return path, entry
+        entry = None
+    return None, entry
+
+
+def fetch_gpx(url):
+    """
+    Zwraca ścieżkę do lokalnej kopii pliku GPX spod ``url`` (nazwa pliku to hash treści)
+    albo ``None``, jeśli pliku nie da się pobrać.
+    """
+    if not url:
+        return None
+    path, entry = _cached_copy(url)
+    if path is not None:
+        return path
+
+    path = _fetch(url, entry)
+    if path is None and entry is not None and gpx_cache.lookup(url) is None:
+        # kopię usunął evict innego procesu w trakcie rewalidacji (304) - pobieramy bez warunków
+        path = _fetch(url, None)
+    return path
+
+
+def _fetch(url, entry):
+    headers = gpx_cache.conditional_headers(entry) if entry is not None else {}
+    try:
+        with profile_section('http'):
+            response = _session.get(url, headers=headers, timeout=settings.GPX_FETCH_TIMEOUT)
+    except requests.RequestException:
+        return _cached_or_none(url, entry)
+    return _handle_response(url, entry, response.status_code, response.content, response.headers)
+
+
+# klient httpx i semafor są związane z pętlą zdarzeń, więc trzymamy po jednym na pętlę
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def _async_client():
+    loop = asyncio.get_running_loop()
+    if loop not in _async_clients:
+        client = httpx.AsyncClient(
+            timeout=httpx.Timeout(settings.GPX_FETCH_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=settings.GPX_FETCH_MAX_CONCURRENCY,
+                max_keepalive_connections=settings.GPX_FETCH_MAX_CONCURRENCY,
+            ),
+            follow_redirects=True,
+        )
+        _async_clients[loop] = (client, asyncio.Semaphore(settings.GPX_FETCH_MAX_CONCURRENCY))
+    return _async_clients[loop]
+
+
+async def afetch_gpx(url):
+    """Asynchroniczny odpowiednik ``fetch_gpx`` korzystający ze współdzielonego klienta httpx."""
+    if not url:
+        return None
+    path, entry = await sync_to_async(_cached_copy, thread_sensitive=False)(url)
+    if path is not None:
+        return path
+
+    path = await _afetch(url, entry)
+    if path is None and entry is not None and await sync_to_async(gpx_cache.lookup, thread_sensitive=False)(url) is None:
+        path = await _afetch(url, None)
+    return path
+
+
+async def _afetch(url, entry):
+    headers = gpx_cache.conditional_headers(entry) if entry is not None else {}
+    client, semaphore = _async_client()
+    try:
+        with profile_section('http'):
+            async with semaphore:
+                response = await client.get(url, headers=headers)
+    except httpx.HTTPError:
+        return await sync_to_async(_cached_or_none, thread_sensitive=False)(url, entry)
+    return await sync_to_async(_handle_response, thread_sensitive=False)(
+        url, entry, response.status_code, response.content, response.headers
+    )
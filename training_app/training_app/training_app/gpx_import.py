@@ -0,0 +1,36 @@
+import zipfile
+from pathlib import Path
+
+# ostatnio otwarte archiwum w danym procesie - pliki z jednego ZIP-a czytamy po kolei
+_open_archive = {}
+
+
+def iter_gpx_sources(path):
+    """
+    Zwraca posortowaną listę ``(ścieżka, nazwa w archiwum)`` plików GPX z katalogu
+    (rekurencyjnie) albo z archiwum ZIP; dla zwykłych plików nazwa to ``None``.
+    """
+    path = Path(path)
+    if path.is_dir():
+        return [(str(file), None) for file in sorted(path.rglob('*')) if file.suffix.lower() == '.gpx' and file.is_file()]
+    with zipfile.ZipFile(path) as archive:
+        return [
+            (str(path), info.filename) for info in sorted(archive.infolist(), key=lambda info: info.filename)
+            if not info.is_dir() and info.filename.lower().endswith('.gpx') and not info.filename.startswith('__MACOSX/')
+        ]
+
+
+def read_gpx_source(path, member=None):
+    if member is None:
+        return Path(path).read_bytes()
+    archive = _open_archive.get(path)
+    if archive is None:
+        for previous in _open_archive.values():
+            previous.close()
+        _open_archive.clear()
+        archive = _open_archive[path] = zipfile.ZipFile(path)
+    return archive.read(member)
+
+
+def source_name(path, member=None):
+    return member if member is not None else Path(path).name
@@ -0,0 +1,87 @@
+import math
+import xml.etree.ElementTree as ET
+from datetime import datetime
+
+import numpy as np
+
+from .profiling import profile_section
+
+GPX_NS = 'http://www.topografix.com/GPX/1/1'
+GPXTPX_NS = 'http://www.garmin.com/xmlschemas/TrackPointExtension/v1'
+
+TRKSEG_TAG = f'{{{GPX_NS}}}trkseg'
+TRKPT_TAG = f'{{{GPX_NS}}}trkpt'
+TIME_TAG = f'{{{GPX_NS}}}time'
+ELE_TAG = f'{{{GPX_NS}}}ele'
+HR_TAG = f'{{{GPXTPX_NS}}}hr'
+
+# czas jako sekundy od epoki (UTC), brakujące wartości to NaN
+TRACKPOINT_DTYPE = np.dtype([
+    ('time', 'f8'),
+    ('hr', 'i2'),
+    ('lat', 'f8'),
+    ('lon', 'f8'),
+    ('ele', 'f4'),
+])
+
+INITIAL_CAPACITY = 4096
+
+
+def _parse_time(text):
+    if not text:
+        return math.nan
+    try:
+        return datetime.fromisoformat(text.strip().replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return math.nan
+
+
+def _parse_float(text):
+    try:
+        return float(text)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def iter_trackpoints(source):
+    """
+    Strumieniowo czyta plik GPX (ścieżka lub obiekt plikowy) i zwraca krotki
+    ``(timestamp, hr, lat, lon, ele)`` dla punktów zawierających tętno.
+    Przetworzone elementy są od razu usuwane z drzewa, więc zużycie pamięci
+    nie zależy od długości śladu.
+    """
+    trkseg = None
+    for event, elem in ET.iterparse(source, events=('start', 'end')):
+        if event == 'start':
+            if elem.tag == TRKSEG_TAG:
+                trkseg = elem
+            continue
+        if elem.tag != TRKPT_TAG:
+            continue
+
+        hr = elem.find(f'.//{HR_TAG}')
+        if hr is not None and hr.text:
+            yield (
+                _parse_time(elem.findtext(TIME_TAG)),
+                int(hr.text),
+                _parse_float(elem.get('lat')),
+                _parse_float(elem.get('lon')),
+                _parse_float(elem.findtext(ELE_TAG)),
+            )
+
+        elem.clear()
+        if trkseg is not None:
+            trkseg.clear()
+
+
+def parse_gpx(source):
+    """Zwraca tablicę NumPy o typie ``TRACKPOINT_DTYPE`` z punktami śladu."""
+    with profile_section('xml'):
+        samples = np.empty(INITIAL_CAPACITY, dtype=TRACKPOINT_DTYPE)
+        count = 0
+        for point in iter_trackpoints(source):
+            if count == len(samples):
+                samples = np.resize(samples, len(samples) * 2)
+            samples[count] = point
+            count += 1
+        return samples[:count].copy()
@@ -0,0 +1,73 @@
+# Funkcje uruchamiane w procesach potomnych puli - modele importujemy dopiero po django.setup()
+import os
+
+import django
+
+
+def init_worker():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'training_app.settings')
+    django.setup()
+    from django.db import connections
+
+    # połączenia odziedziczone po procesie nadrzędnym nie mogą być współdzielone
+    connections.close_all()
+
+
+# hashe plików, które zawodnik już ma - ustawiane przez init_import_worker
+_known_hashes = frozenset()
+
+
+def init_import_worker(known_hashes):
+    global _known_hashes
+    init_worker()
+    _known_hashes = frozenset(known_hashes)
+
+
+def run_job(job_id):
+    from .jobs import process_job
+
+    return process_job(job_id)
+
+
+def parse_gpx_file(source, zones_boundaries):
+    """
+    Parsuje jeden plik GPX importu (``import_gpx``) i zwraca dane gotowe do
+    ``bulk_create``: hash treści, datę, metryki i spakowane próbki. Plik jest
+    czytany tylko tutaj, więc proces nadrzędny nie otwiera archiwum ZIP, które
+    procesy potomne odziedziczyłyby razem z pozycją w pliku. Pliki o znanym hashu
+    (``init_import_worker``) nie są parsowane - ``skipped`` jest wtedy ustawione.
+    Nie korzysta z bazy.
+    """
+    import hashlib
+    import io
+    from datetime import datetime
+
+    import numpy as np
+    from django.utils import timezone
+
+    from .gpx_import import read_gpx_source, source_name
+    from .gpx_parser import parse_gpx
+    from .metrics import compute_metrics
+    from .sample_store import pack_samples
+
+    result = {'name': source_name(*source), 'content_hash': None, 'skipped': False, 'error': None}
+    try:
+        content = read_gpx_source(*source)
+        result['content_hash'] = hashlib.sha256(content).hexdigest()
+        if result['content_hash'] in _known_hashes:
+            result['skipped'] = True
+            return result
+        samples = parse_gpx(io.BytesIO(content))
+    except Exception as exc:
+        result['error'] = str(exc)
+        return result
+
+    result['sample_count'] = int(samples.size)
+    result['metrics'] = compute_metrics(samples, zones_boundaries)
+    result['samples'] = pack_samples(samples)
+    times = samples['time'][np.isfinite(samples['time'])]
+    if times.size:
+        result['date'] = datetime.fromtimestamp(float(times[0]), tz=timezone.get_default_timezone()).date()
+    else:
+        result['date'] = None
+    return result
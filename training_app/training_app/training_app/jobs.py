@@ -0,0 +1,91 @@
+from datetime import timedelta
+
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from .gpx_cache import fetch_gpx
+from .gpx_parser import parse_gpx
+from .metrics import save_training_metrics
+from .models import GpxJob
+from .sample_store import load_training_samples, save_training_samples
+from .zone_profiles import load_zones_boundaries
+
+# zadanie dłużej w stanie 'running' uznajemy za przerwane (np. po restarcie workera)
+STALE_JOB_TIMEOUT = timedelta(minutes=15)
+
+
+def enqueue_gpx_job(training):
+    """Dodaje zadanie analizy pliku GPX treningu, o ile nie czeka już inne."""
+    job = GpxJob.objects.filter(training=training, status='pending').first()
+    if job is None:
+        job = GpxJob.objects.create(training=training)
+    return job
+
+
+def enqueue_gpx_jobs(trainings, batch_size=1000):
+    """Zbiorcza wersja ``enqueue_gpx_job`` dla querysetu treningów; zwraca liczbę nowych zadań."""
+    training_ids = trainings.exclude(gpx_jobs__status='pending').values_list('pk', flat=True)
+    jobs = [GpxJob(training_id=training_id) for training_id in training_ids.iterator()]
+    GpxJob.objects.bulk_create(jobs, batch_size=batch_size)
+    return len(jobs)
+
+
+def claim_jobs(limit):
+    """Oznacza do ``limit`` oczekujących zadań jako uruchomione i zwraca ich id."""
+    claimed = []
+    for job_id in GpxJob.objects.filter(status='pending').order_by('created_at').values_list('id', flat=True)[:limit]:
+        # warunek na status chroni przed przejęciem zadania przez dwa procesy naraz
+        if GpxJob.objects.filter(pk=job_id, status='pending').update(status='running', started_at=timezone.now()):
+            claimed.append(job_id)
+    return claimed
+
+
+def requeue_stale_jobs(timeout):
+    return GpxJob.objects.filter(status='running', started_at__lt=timezone.now() - timeout).update(status='pending')
+
+
+def process_job(job_id):
+    try:
+        job = GpxJob.objects.select_related('training').get(pk=job_id)
+    except GpxJob.DoesNotExist:
+        # trening (a z nim zadanie) usunięto po przejęciu zadania
+        return 'missing'
+    try:
+        # zapisane próbki wystarczą do przeliczenia metryk (np. po zmianie profilu stref)
+        samples = load_training_samples(job.training)
+        if samples is None:
+            gpx_path = fetch_gpx(job.training.gpx_url)
+            if gpx_path is None:
+                raise ValueError(f'Nie udało się pobrać pliku GPX: {job.training.gpx_url}')
+            samples = parse_gpx(gpx_path)
+            save_training_samples(job.training, samples, gpx_path.stem)
+        # profil czytany z bazy, bo cache w pamięci workera mógł jeszcze nie wygasnąć
+        zones_boundaries = load_zones_boundaries(job.training.competitor_id)
+        save_training_metrics(job.training, samples, zones_boundaries)
+    except Exception as exc:
+        job.status = 'failed'
+        job.error = str(exc)
+    else:
+        job.status = 'done'
+        job.error = None
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'error', 'finished_at'])
+    return job.status
+
+
+def requeue_jobs(job_ids):
+    """Przywraca do kolejki przejęte zadania, których proces roboczy nie dokończył."""
+    return GpxJob.objects.filter(pk__in=job_ids, status='running').update(status='pending', started_at=None)
+
+
+def fail_job(job_id, error):
+    """Oznacza zadanie jako nieudane, gdy proces roboczy nie zwrócił wyniku."""
+    return GpxJob.objects.filter(pk=job_id, status='running').update(
+        status='failed', error=error, finished_at=timezone.now(),
+    )
+
+
+def with_job_status(trainings):
+    """Dodaje do querysetu treningów status ostatniego zadania GPX (``gpx_job_status``)."""
+    latest_job = GpxJob.objects.filter(training=OuterRef('pk')).order_by('-created_at')
+    return trainings.annotate(gpx_job_status=Subquery(latest_job.values('status')[:1]))
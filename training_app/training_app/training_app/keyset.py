@@ -0,0 +1,135 @@
+from django.core import signing
+from django.db.models import Q
+from django.utils.dateparse import parse_date
+
+CURSOR_SALT = 'training_app.keyset'
+
+
+class KeysetPage:
+    """
+    Strona listy treningów wyznaczona kluczem (data, id) zamiast numerem strony.
+    Kursory są podpisanymi tokenami, które niosą też filtry i rozmiar strony.
+    """
+
+    def __init__(self, object_list, state, has_previous, has_next, count=None):
+        self.object_list = object_list
+        self.state = state
+        self.has_previous = has_previous
+        self.has_next = has_next
+        self.count = count
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def first_cursor(self):
+        return encode_cursor(self.state, None, backward=False)
+
+    @property
+    def last_cursor(self):
+        return encode_cursor(self.state, None, backward=True)
+
+    @property
+    def previous_cursor(self):
+        return encode_cursor(self.state, _key(self.object_list[0]), backward=True) if self.object_list else None
+
+    @property
+    def next_cursor(self):
+        return encode_cursor(self.state, _key(self.object_list[-1]), backward=False) if self.object_list else None
+
+
+def cursor_state(filters, per_page, count=False):
+    """Stan listy bez pozycji - pierwsza strona dla podanych filtrów."""
+    return {'filters': filters, 'per_page': per_page, 'count': count, 'key': None, 'backward': False}
+
+
+def encode_cursor(state, key, backward):
+    payload = dict(state, key=key, backward=backward)
+    return signing.dumps(payload, salt=CURSOR_SALT, compress=True)
+
+
+def decode_cursor(token):
+    """Stan listy z tokenu albo ``None``, jeśli token jest pusty, uszkodzony lub podrobiony."""
+    if not token:
+        return None
+    try:
+        state = signing.loads(token, salt=CURSOR_SALT)
+        key = state['key']
+        if key is not None:
+            key = [parse_date(key[0]) if key[0] else None, int(key[1])]
+        return {
+            'filters': dict(state['filters']),
+            'per_page': int(state['per_page']),
+            'count': bool(state['count']),
+            'key': key,
+            'backward': bool(state['backward']),
+        }
+    except (signing.BadSignature, KeyError, TypeError, ValueError, IndexError):
+        return None
+
+
+def _key(training):
+    return [training.date.isoformat() if training.date else None, training.pk]
+
+
+def _segments(queryset, key, backward):
+    """
+    Zapytania w kolejności listy: najpierw treningi z datą (data i id malejąco),
+    potem treningi bez daty (id malejąco). Warunek na kluczu jest zakresem po
+    indeksie (..., -date, -id), więc dalsze strony kosztują tyle co pierwsza.
+    """
+    dated = queryset.filter(date__isnull=False)
+    undated = queryset.filter(date__isnull=True)
+    key_date, key_id = key if key is not None else (None, None)
+
+    if not backward:
+        if key is None:
+            yield dated.order_by('-date', '-id')
+        elif key_date is not None:
+            yield dated.filter(Q(date__lte=key_date) & (Q(date__lt=key_date) | Q(id__lt=key_id))).order_by('-date', '-id')
+        if key is None or key_date is not None:
+            yield undated.order_by('-id')
+        else:
+            yield undated.filter(id__lt=key_id).order_by('-id')
+    else:
+        if key_date is None:
+            yield (undated.filter(id__gt=key_id) if key is not None else undated).order_by('id')
+            yield dated.order_by('date', 'id')
+        else:
+            yield dated.filter(Q(date__gte=key_date) & (Q(date__gt=key_date) | Q(id__gt=key_id))).order_by('date', 'id')
+
+
+def keyset_page(queryset, state):
+    """
+    Pobiera ``per_page`` treningów za kluczem z ``state`` (albo przed nim przy
+    ``backward``). Zamiast COUNT pobierany jest jeden wiersz więcej, żeby
+    sprawdzić, czy istnieje kolejna strona; dokładna liczba tylko przy ``count``.
+    """
+    per_page = state['per_page']
+    key = state['key']
+    backward = state['backward']
+
+    rows = []
+    for segment in _segments(queryset, key, backward):
+        rows.extend(segment[:per_page + 1 - len(rows)])
+        if len(rows) > per_page:
+            break
+
+    if not rows and key is not None:
+        # za kluczem nic nie zostało (np. treningi usunięto): przy "następnej" pokazujemy ostatnią
+        # stronę, przy "poprzedniej" - pierwszą
+        return keyset_page(queryset, dict(state, key=None, backward=not backward))
+
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backward:
+        rows.reverse()
+        has_previous, has_next = more, key is not None
+    else:
+        has_previous, has_next = key is not None, more
+
+    count = queryset.count() if state['count'] else None
+    return KeysetPage(rows, state, has_previous, has_next, count)
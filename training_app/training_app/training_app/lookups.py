@@ -0,0 +1,102 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .models import TrainingType, User
+
+# Małe tabele słownikowe czytane przy każdym renderowaniu formularzy treningu.
+LOOKUPS = {
+    'training_types': lambda: list(TrainingType.objects.order_by('pk')),
+    'coaches': lambda: list(User.objects.filter(role='coach').order_by('pk')),
+}
+
+# nazwa -> (wersja, czas wczytania, lista obiektów, obiekty po pk); każdy proces ma własną kopię
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _versions():
+    return caches[settings.LOOKUP_VERSION_CACHE]
+
+
+def _version_key(name):
+    return f'lookup-version:{name}'
+
+
+def get_version(key):
+    """Wersja danych zapamiętanych w pamięci procesu pod kluczem ``key`` (wspólna dla procesów)."""
+    return _versions().get(key, 0)
+
+
+def bump_version(key):
+    """Unieważnia kopie danych ``key`` we wszystkich procesach korzystających z ``LOOKUP_VERSION_CACHE``."""
+    versions = _versions()
+    versions.add(key, 0, timeout=None)
+    try:
+        versions.incr(key)
+    except ValueError:
+        # klucz zniknął między add a incr
+        versions.set(key, 1, timeout=None)
+
+
+def _lookup(name):
+    """
+    Lista z cache w pamięci procesu. Wpis jest ważny, dopóki wersja w cache
+    ``LOOKUP_VERSION_CACHE`` się nie zmieni (sygnały po zapisie lub usunięciu)
+    i nie minie ``LOOKUP_CACHE_TTL`` sekund.
+    """
+    version = get_version(_version_key(name))
+    now = time.monotonic()
+    with _cache_lock:
+        entry = _cache.get(name)
+    if entry is not None and entry[0] == version and now - entry[1] < settings.LOOKUP_CACHE_TTL:
+        return entry
+    objects = LOOKUPS[name]()
+    entry = (version, now, objects, {obj.pk: obj for obj in objects})
+    with _cache_lock:
+        _cache[name] = entry
+    return entry
+
+
+def _by_pk(name, pk):
+    try:
+        return _lookup(name)[3].get(int(pk))
+    except (TypeError, ValueError):
+        return None
+
+
+def training_types():
+    return _lookup('training_types')[2]
+
+
+def get_training_type(pk):
+    """Rodzaj treningu o podanym id (także jako napis z formularza) albo ``None``."""
+    return _by_pk('training_types', pk)
+
+
+def coaches():
+    return _lookup('coaches')[2]
+
+
+def get_coach(pk):
+    """Trener o podanym id (także jako napis z formularza) albo ``None``."""
+    return _by_pk('coaches', pk)
+
+
+def invalidate_lookup(name):
+    """
+    Podbija wersję listy w ``LOOKUP_VERSION_CACHE``. Procesy korzystające z tego
+    samego backendu wczytają listę ponownie przy następnym użyciu; przy cache
+    lokalnym dla procesu (np. LocMemCache) zmiana dotrze do innych procesów
+    dopiero po ``LOOKUP_CACHE_TTL``.
+    """
+    bump_version(_version_key(name))
+    with _cache_lock:
+        _cache.pop(name, None)
+
+
+def invalidate_lookups():
+    for name in LOOKUPS:
+        invalidate_lookup(name)
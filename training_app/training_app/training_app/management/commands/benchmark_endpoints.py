@@ -0,0 +1,219 @@
+import io
+import json
+import math
+import statistics
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import (
+    CaptureQueriesContext, override_settings, setup_test_environment, teardown_test_environment,
+)
+from django.urls import reverse
+from training_app import gpx_cache as gpx_cache_module
+from training_app.gpx_cache import GpxCache
+from training_app.keyset import cursor_state, encode_cursor
+from training_app.models import Training, User
+
+GPX_FIXTURE_POINTS = (1000, 10000, 100000)
+
+
+def write_fixture_gpx(path, points):
+    start = datetime(2024, 5, 1, 8, 0, tzinfo=timezone.utc)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                '<gpx version="1.1" xmlns="http://www.topografix.com/GPX/1/1" '
+                'xmlns:gpxtpx="http://www.garmin.com/xmlschemas/TrackPointExtension/v1">'
+                '<trk><trkseg>\n')
+        for i in range(points):
+            # interwały: wolna sinusoida z szybszymi wahaniami, żeby strefy często się zmieniały
+            hr = int(140 + 35 * math.sin(i / 600) + 12 * math.sin(i / 17))
+            timestamp = (start + timedelta(seconds=i)).strftime('%Y-%m-%dT%H:%M:%SZ')
+            f.write(f'<trkpt lat="{50 + i * 1e-5:.7f}" lon="{19 + i * 1e-5:.7f}"><ele>{200 + i % 50}</ele>'
+                    f'<time>{timestamp}</time><extensions><gpxtpx:TrackPointExtension>'
+                    f'<gpxtpx:hr>{hr}</gpxtpx:hr></gpxtpx:TrackPointExtension></extensions></trkpt>\n')
+        f.write('</trkseg></trk></gpx>\n')
+
+
+class QuietFixtureHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the coach and competitor endpoints on a seeded test database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--competitors', type=int, default=200)
+        parser.add_argument('--trainings-per-competitor', type=int, default=50)
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--output', default='benchmark_results.json', help='Where to write the JSON results')
+        parser.add_argument('--baseline', help='Previous results file to compare against')
+        parser.add_argument('--max-regression', type=float, default=0.2,
+                            help='Allowed relative p50 slowdown against the baseline before failing')
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_db_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        fixtures_dir = tempfile.TemporaryDirectory()
+        server = None
+        old_gpx_cache = gpx_cache_module.gpx_cache
+        try:
+            gpx_cache_module.gpx_cache = GpxCache(
+                Path(fixtures_dir.name) / 'cache', settings.GPX_CACHE_MAX_BYTES, settings.GPX_CACHE_MAX_AGE
+            )
+            server = self.serve_fixtures(fixtures_dir.name)
+            # osobne, puste cache w pamięci, żeby wyniki nie zależały od poprzednich przebiegów
+            isolated_caches = {
+                alias: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': f'benchmark-{alias}'}
+                for alias in settings.CACHES
+            }
+            with override_settings(CACHES=isolated_caches):
+                results = self.run(options, server)
+        finally:
+            if server is not None:
+                server.shutdown()
+            gpx_cache_module.gpx_cache = old_gpx_cache
+            fixtures_dir.cleanup()
+            connection.creation.destroy_test_db(old_db_name, verbosity=0)
+            teardown_test_environment()
+
+        with open(options['output'], 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        self.report(results)
+        self.stdout.write(self.style.SUCCESS(f'Wyniki zapisano w {options["output"]}'))
+
+        if options['baseline']:
+            self.compare(results, options['baseline'], options['max_regression'])
+
+    def serve_fixtures(self, directory):
+        for points in GPX_FIXTURE_POINTS:
+            write_fixture_gpx(Path(directory) / f'track_{points}.gpx', points)
+        server = ThreadingHTTPServer(('127.0.0.1', 0), partial(QuietFixtureHandler, directory=directory))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+    def run(self, options, server):
+        call_command(
+            'generate_data',
+            competitors=options['competitors'],
+            trainings_per_competitor=options['trainings_per_competitor'],
+            stdout=io.StringIO(),
+        )
+        coach = User.objects.filter(role='coach').annotate(n=Count('coached_trainings')).order_by('-n').first()
+        competitor = User.objects.filter(role='competitor', participated_trainings__coach=coach).first()
+        if coach is None or competitor is None:
+            raise CommandError('Nie udało się wygenerować danych testowych.')
+
+        host, port = server.server_address
+        template = Training.objects.filter(competitor=competitor).first()
+        detail_trainings = {}
+        for points in GPX_FIXTURE_POINTS:
+            template.pk = None
+            template.gpx_url = f'http://{host}:{port}/track_{points}.gpx'
+            template.save()
+            detail_trainings[points] = template.pk
+
+        coach_client = Client()
+        coach_client.force_login(coach)
+        competitor_client = Client()
+        competitor_client.force_login(competitor)
+
+        endpoints = {
+            'trener_list': (coach_client, reverse('trener')),
+            # ostatnia strona listy - przy paginacji kluczem powinna kosztować tyle co pierwsza
+            'trener_list_last': (coach_client, reverse('trener') + '?cursor=' + encode_cursor(
+                cursor_state({}, settings.TRAINING_PAGE_SIZE), None, backward=True)),
+            'trener_csv': (coach_client, reverse('trener') + '?download_csv=1'),
+            'trener_dashboard': (coach_client, reverse('trener_dashboard')),
+            'zawodnik_list': (competitor_client, reverse('zawodnik')),
+            'zawodnik_csv': (competitor_client, reverse('zawodnik') + '?download_csv=1'),
+        }
+        for points, pk in detail_trainings.items():
+            endpoints[f'trener_training_detail_{points}'] = (coach_client, reverse('trener_training_detail', args=[pk]))
+            endpoints[f'training_chart_data_{points}'] = (coach_client, reverse('training_chart_data', args=[pk]))
+
+        results = {
+            'scale': {
+                'competitors': options['competitors'],
+                'trainings_per_competitor': options['trainings_per_competitor'],
+                'trainings': Training.objects.count(),
+                'coach_trainings': Training.objects.filter(coach=coach).count(),
+                'iterations': options['iterations'],
+            },
+            'endpoints': {},
+        }
+        for name, (client, url) in endpoints.items():
+            self.stdout.write(f'{name}...')
+            results['endpoints'][name] = self.measure(client, url, options['iterations'])
+        return results
+
+    def measure(self, client, url, iterations):
+        timings = []
+        queries = None
+        for i in range(iterations + 1):
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                response = client.get(url)
+                if response.streaming:
+                    size = sum(len(chunk) for chunk in response.streaming_content)
+                else:
+                    size = len(response.content)
+                elapsed_ms = (time.perf_counter() - start) * 1000
+            if response.status_code != 200:
+                raise CommandError(f'{url} zwrócił status {response.status_code}')
+            if i == 0:
+                # pierwsze żądanie rozgrzewa cache (np. pobranie pliku GPX)
+                first_ms = elapsed_ms
+                queries = len(captured)
+                continue
+            timings.append(elapsed_ms)
+        return {
+            'first_ms': round(first_ms, 3),
+            'p50_ms': round(statistics.median(timings), 3),
+            'p99_ms': round(percentile(timings, 0.99), 3),
+            'mean_ms': round(statistics.mean(timings), 3),
+            'queries': queries,
+            'response_bytes': size,
+        }
+
+    def report(self, results):
+        for name, result in results['endpoints'].items():
+            self.stdout.write(
+                f'{name:40} p50 {result["p50_ms"]:9.2f} ms  p99 {result["p99_ms"]:9.2f} ms  '
+                f'zapytania {result["queries"]:3}  {result["response_bytes"]} B'
+            )
+
+    def compare(self, results, baseline_path, max_regression):
+        with open(baseline_path, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = []
+        for name, result in results['endpoints'].items():
+            previous = baseline.get('endpoints', {}).get(name)
+            if previous is None:
+                continue
+            change = result['p50_ms'] / previous['p50_ms'] - 1 if previous['p50_ms'] else 0
+            line = f'{name:40} p50 {change:+.1%}  zapytania {previous["queries"]} -> {result["queries"]}'
+            if change > max_regression or result['queries'] > previous['queries']:
+                regressions.append(name)
+                self.stdout.write(self.style.ERROR(line))
+            else:
+                self.stdout.write(line)
+        if regressions:
+            raise CommandError(f'Regresja wydajności: {", ".join(regressions)}')
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from training_app.gpx_cache import fetch_gpx
+from training_app.gpx_parser import parse_gpx
+from training_app.metrics import save_training_metrics
+from training_app.models import Training
+from training_app.sample_store import load_training_samples, save_training_samples
+from training_app.zone_profiles import current_zones_boundaries
+
+
+class Command(BaseCommand):
+    help = 'Compute heart rate metrics for trainings with a GPX file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Recompute metrics that already exist')
+
+    def handle(self, *args, **options):
+        trainings = Training.objects.exclude(gpx_url__isnull=True).exclude(gpx_url='')
+        if not options['all']:
+            trainings = trainings.filter(metrics__isnull=True)
+
+        computed = failed = 0
+        zones_boundaries = {}
+        for training in trainings.iterator():
+            samples = load_training_samples(training)
+            if samples is None:
+                gpx_path = fetch_gpx(training.gpx_url)
+                if gpx_path is None:
+                    failed += 1
+                    self.stderr.write(f'Nie udało się pobrać pliku GPX dla treningu {training.pk}')
+                    continue
+                samples = parse_gpx(gpx_path)
+                save_training_samples(training, samples, gpx_path.stem)
+            if training.competitor_id not in zones_boundaries:
+                zones_boundaries[training.competitor_id] = current_zones_boundaries(training.competitor_id)
+            save_training_metrics(training, samples, zones_boundaries[training.competitor_id])
+            computed += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Obliczono metryki dla {computed} treningów (błędy: {failed}).'))
@@ -0,0 +1,78 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from training_app.jobs import with_job_status
+from training_app.keyset import _segments
+from training_app.models import Training, User
+
+# select_related list treningów jak w ZawodnikView i TrenerView
+COMPETITOR_RELATED = ('training_type', 'coach', 'metrics')
+COACH_RELATED = ('training_type', 'competitor', 'metrics')
+
+
+class Command(BaseCommand):
+    help = 'Show query plans and timings for the coach and competitor training list queries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--coach', type=int, help='Coach id (defaults to the coach with the most trainings)')
+        parser.add_argument('--competitor', type=int, help='Competitor id (defaults to one of the coach\'s competitors)')
+        parser.add_argument('--date-from', default='2024-01-01')
+        parser.add_argument('--date-to', default='2024-12-31')
+        parser.add_argument('--page-size', type=int, default=5)
+        parser.add_argument('--cursor-offset', type=int, default=1000,
+                            help='Position in the list of the key used for the deep cursor page')
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        coach = self.get_user(options['coach'], 'coach', 'coached_trainings')
+        competitor = self.get_user(
+            options['competitor'], 'competitor', 'participated_trainings', participated_trainings__coach=coach
+        )
+        date_range = {'date__gte': options['date_from'], 'date__lte': options['date_to']}
+
+        queries = {
+            'zawodnik': ({'competitor': competitor}, COMPETITOR_RELATED),
+            'zawodnik + daty': ({'competitor': competitor, **date_range}, COMPETITOR_RELATED),
+            'trener': ({'coach': coach}, COACH_RELATED),
+            'trener + daty': ({'coach': coach, **date_range}, COACH_RELATED),
+            'trener + zawodnik': ({'coach': coach, 'competitor': competitor}, COACH_RELATED),
+            'trener + zawodnik + daty': ({'coach': coach, 'competitor': competitor, **date_range}, COACH_RELATED),
+        }
+
+        for label, (filters, related) in queries.items():
+            # te same zapytania co w widokach: status zadania GPX, kolejność (data, id) i zakres po kluczu
+            queryset = with_job_status(Training.objects.filter(**filters).select_related(*related)).order_by('-date', '-id')
+            pages = {'pierwsza strona': None}
+            deep_key = self.deep_key(queryset, options['cursor_offset'])
+            if deep_key is not None:
+                pages[f'kursor ({deep_key[0]}, id {deep_key[1]})'] = deep_key
+
+            for page_label, key in pages.items():
+                for number, segment in enumerate(_segments(queryset, key, backward=False), 1):
+                    page = segment[:options['page_size'] + 1]
+                    start = time.perf_counter()
+                    for _ in range(options['repeat']):
+                        list(page)
+                    elapsed_ms = (time.perf_counter() - start) * 1000 / options['repeat']
+
+                    self.stdout.write(self.style.MIGRATE_HEADING(
+                        f'{label}, {page_label}, segment {number} ({elapsed_ms:.2f} ms)'
+                    ))
+                    self.stdout.write(page.explain())
+                    self.stdout.write('')
+
+    def deep_key(self, queryset, offset):
+        """Klucz (data, id) treningu z datą na pozycji ``offset`` (albo ostatniego), jak w kursorze listy."""
+        dated = queryset.filter(date__isnull=False).values_list('date', 'id')
+        key = dated[offset:offset + 1].first() or dated.last()
+        return list(key) if key is not None else None
+
+    def get_user(self, pk, role, related_name, **filters):
+        users = User.objects.filter(role=role, **filters)
+        if pk is not None:
+            users = users.filter(pk=pk)
+        user = users.annotate(training_count=Count(related_name)).order_by('-training_count', 'pk').first()
+        if user is None:
+            raise CommandError(f'Brak użytkownika z rolą {role}.')
+        return user
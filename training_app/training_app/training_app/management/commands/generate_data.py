@@ -1,14 +1,25 @@
 import random
 from datetime import datetime, timedelta
+from django.contrib.auth.hashers import make_password
 from django.core.management.base import BaseCommand
+from django.db import transaction
 from django.utils import timezone
 from django.contrib.auth import get_user_model
 from training_app.models import TrainingType, Training
+from training_app.lookups import invalidate_lookups
+from training_app.search import rebuild_search_index
+from training_app.weekly_load import rebuild_weekly_load
 from faker import Faker
 
 class Command(BaseCommand):
     help = 'Generate data for coaches, competitors, and trainings'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--coaches', type=int, default=3, help='Number of coaches')
+        parser.add_argument('--competitors', type=int, default=30, help='Number of competitors')
+        parser.add_argument('--trainings-per-competitor', type=int, default=5, help='Trainings generated for each competitor')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per bulk_create batch')
+
     def random_date(self, start, end):
         """
         This function will return a random datetime between two datetime
@@ -19,17 +30,22 @@ class Command(BaseCommand):
         random_day = random.randrange(int_delta)
         return start + timedelta(days=random_day)
 
-    def handle(self, *args, **kwargs):
+    def handle(self, *args, **options):
         User = get_user_model()
         fake = Faker()
+        batch_size = options['batch_size']
+
+        # Jeden hash hasła dla wszystkich generowanych kont - haszowanie jest celowo wolne
+        password = make_password('password')
 
         # Tworzenie typów treningów
         training_types = ['threshold', 'intervals', 'recovery', 'functional', 'strength', 'general']
         for t in training_types:
             TrainingType.objects.get_or_create(training_type=t)
+        training_type_ids = list(TrainingType.objects.filter(training_type__in=training_types).values_list('id', flat=True))
 
         # Definicje trenerów (generowanie realistycznych imion i nazwisk)
-        coaches_info = [(fake.unique.user_name(), fake.first_name(), fake.last_name()) for _ in range(3)]
+        coaches_info = [(fake.unique.user_name(), fake.first_name(), fake.last_name()) for _ in range(options['coaches'])]
 
         # Tworzenie trenerów
         coaches = []
@@ -37,7 +53,7 @@ class Command(BaseCommand):
             coach, created = User.objects.get_or_create(
                 username=username,
                 defaults={
-                    'password': 'password',
+                    'password': password,
                     'name': name,
                     'surname': surname,
                     'role': 'coach'
@@ -65,36 +81,59 @@ class Command(BaseCommand):
         start_date = datetime(2024, 1, 1, tzinfo=timezone.utc)
         end_date = timezone.now()
 
-        # Generowanie zawodników i treningów
-        for i in range(1, 31):
-            name = fake.first_name()
-            surname = fake.last_name()
-            competitor = User.objects.create_user(
-                username=f'zawodnik{i}',
-                password='password',
-                name=name,
-                surname=surname,
-                role='competitor'
-            )
-            coach = random.choice(coaches)
-            coach.competitors.add(competitor)
-            # Generowanie 5 treningów dla każdego zawodnika
-            for k in range(5):
-                training_type = TrainingType.objects.order_by('?').first()
-                gpx_url = random.choice(gpx_urls)
-                training_date = self.random_date(start_date, end_date)
-                feeling_number = str(random.randint(1, 6))
-                selected_feeling = feeling_choices.get(feeling_number, 'Neutralnie')
-                Training.objects.create(
-                    training_type=training_type,
-                    date=training_date.date(),
-                    training_description=f'Opis treningu {k+1} dla zawodnika {competitor.name} {competitor.surname}',
-                    gpx_url=gpx_url,
-                    coach=coach,
-                    competitor=competitor,
-                    feeling=selected_feeling,
-                    coach_comment=f'Komentarz trenera {coach.name} {coach.surname} do treningu {k+1}'
-                )
-            coach.save()
-
-        self.stdout.write(self.style.SUCCESS('Dane zostały wygenerowane.'))
+        # Numeracja kont kontynuuje istniejące konta zawodników
+        first_index = User.objects.filter(username__startswith='zawodnik').count() + 1
+        competitor_coach = User.competitors.through
+
+        trainings = []
+        created_trainings = 0
+        # Generowanie zawodników i treningów partiami
+        for batch_start in range(0, options['competitors'], batch_size):
+            batch_indices = range(first_index + batch_start, first_index + min(batch_start + batch_size, options['competitors']))
+            with transaction.atomic():
+                competitors = User.objects.bulk_create([
+                    User(
+                        username=f'zawodnik{i}',
+                        password=password,
+                        name=fake.first_name(),
+                        surname=fake.last_name(),
+                        role='competitor'
+                    )
+                    for i in batch_indices
+                ])
+                assignments = [(random.choice(coaches), competitor) for competitor in competitors]
+                competitor_coach.objects.bulk_create([
+                    competitor_coach(from_user_id=coach.id, to_user_id=competitor.id)
+                    for coach, competitor in assignments
+                ])
+
+            for coach, competitor in assignments:
+                for k in range(options['trainings_per_competitor']):
+                    feeling_number = str(random.randint(1, 6))
+                    trainings.append(Training(
+                        training_type_id=random.choice(training_type_ids),
+                        date=self.random_date(start_date, end_date).date(),
+                        training_description=f'Opis treningu {k+1} dla zawodnika {competitor.name} {competitor.surname}',
+                        gpx_url=random.choice(gpx_urls),
+                        coach_id=coach.id,
+                        competitor_id=competitor.id,
+                        feeling=feeling_choices.get(feeling_number, 'Neutralnie'),
+                        coach_comment=f'Komentarz trenera {coach.name} {coach.surname} do treningu {k+1}'
+                    ))
+                    if len(trainings) >= batch_size:
+                        Training.objects.bulk_create(trainings)
+                        created_trainings += len(trainings)
+                        trainings = []
+
+            self.stdout.write(f'Zawodnicy: {batch_start + len(competitors)}, treningi: {created_trainings}')
+
+        if trainings:
+            Training.objects.bulk_create(trainings)
+            created_trainings += len(trainings)
+
+        # bulk_create pomija sygnały, więc tabelę obciążeń tygodniowych, indeks wyszukiwania i słowniki odświeżamy na końcu
+        rebuild_weekly_load(batch_size=batch_size)
+        rebuild_search_index()
+        invalidate_lookups()
+
+        self.stdout.write(self.style.SUCCESS(f'Dane zostały wygenerowane ({created_trainings} treningów).'))
@@ -0,0 +1,121 @@
+import os
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from training_app.gpx_import import iter_gpx_sources, source_name
+from training_app.job_worker import init_import_worker, parse_gpx_file
+from training_app.models import Training, TrainingMetrics, TrainingSamples, TrainingType, User
+from training_app.search import index_trainings
+from training_app.weekly_load import refresh_weekly_load, week_start
+from training_app.zone_profiles import current_zones_boundaries
+from training_app.zones import format_zones_boundaries
+
+
+class Command(BaseCommand):
+    help = 'Import a directory or zip archive of GPX files as trainings of one competitor'
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', help='Directory or .zip archive with GPX files')
+        parser.add_argument('--competitor', required=True, help='Username of the competitor')
+        parser.add_argument('--coach', help='Username of the coach assigned to the imported trainings')
+        parser.add_argument('--training-type', default='general',
+                            choices=[code for code, _ in TrainingType.TRAINING_CHOICES])
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 2, help='Number of parsing processes')
+        parser.add_argument('--batch-size', type=int, default=100, help='Trainings saved per transaction')
+
+    def handle(self, *args, **options):
+        competitor = User.objects.filter(username=options['competitor'], role='competitor').first()
+        if competitor is None:
+            raise CommandError(f'Nie znaleziono zawodnika {options["competitor"]}.')
+        coach = None
+        if options['coach']:
+            coach = User.objects.filter(username=options['coach'], role='coach').first()
+            if coach is None:
+                raise CommandError(f'Nie znaleziono trenera {options["coach"]}.')
+        training_type, _ = TrainingType.objects.get_or_create(training_type=options['training_type'])
+        zones_boundaries = current_zones_boundaries(competitor.pk)
+
+        try:
+            sources = iter_gpx_sources(options['source'])
+        except (OSError, ValueError, zipfile.BadZipFile) as exc:
+            raise CommandError(f'Nie można odczytać {options["source"]}: {exc}')
+
+        # import można wznowić: pliki, których próbki zawodnik już ma, są pomijane
+        known_hashes = set(
+            TrainingSamples.objects.filter(training__competitor=competitor).values_list('content_hash', flat=True)
+        )
+        self.stdout.write(f'Pliki GPX: {len(sources)}')
+
+        self.start = time.perf_counter()
+        self.imported = self.samples_total = 0
+        self.dates = set()
+        skipped = failed = 0
+        batch = []
+        # pliki czytają (i liczą hash) wyłącznie procesy potomne
+        with ProcessPoolExecutor(
+            max_workers=options['workers'], initializer=init_import_worker, initargs=(known_hashes,)
+        ) as pool:
+            results = pool.map(parse_gpx_file, sources, repeat(zones_boundaries), chunksize=4)
+            for source, result in zip(sources, results):
+                if result['error'] is not None:
+                    failed += 1
+                    self.stderr.write(f'{source_name(*source)}: {result["error"]}')
+                    continue
+                # ten sam plik może wystąpić w źródle kilka razy
+                if result['skipped'] or result['content_hash'] in known_hashes:
+                    skipped += 1
+                    continue
+                known_hashes.add(result['content_hash'])
+                batch.append(result)
+                if len(batch) >= options['batch_size']:
+                    self.save_batch(batch, competitor, coach, training_type, zones_boundaries)
+                    self.report()
+                    batch = []
+            if batch:
+                self.save_batch(batch, competitor, coach, training_type, zones_boundaries)
+
+        # bulk_create pomija sygnały, więc tygodniowe obciążenia odświeżamy tu
+        for week in {week_start(day) for day in self.dates}:
+            refresh_weekly_load(competitor.pk, week)
+
+        self.report()
+        self.stdout.write(self.style.SUCCESS(
+            f'Zaimportowano {self.imported} treningów (pominięte: {skipped}, błędy: {failed}).'
+        ))
+
+    def save_batch(self, results, competitor, coach, training_type, zones_boundaries):
+        zones_key = format_zones_boundaries(zones_boundaries)
+        with transaction.atomic():
+            trainings = Training.objects.bulk_create([
+                Training(
+                    training_type=training_type,
+                    date=result['date'],
+                    training_description=f'Zaimportowano z pliku {result["name"]}',
+                    coach=coach,
+                    competitor=competitor,
+                )
+                for result in results
+            ])
+            TrainingMetrics.objects.bulk_create([
+                TrainingMetrics(training=training, zones_boundaries=zones_key, **result['metrics'])
+                for training, result in zip(trainings, results)
+            ])
+            TrainingSamples.objects.bulk_create([
+                TrainingSamples(training=training, content_hash=result['content_hash'], **result['samples'])
+                for training, result in zip(trainings, results)
+            ])
+            index_trainings(trainings)
+        self.imported += len(results)
+        self.samples_total += sum(result['sample_count'] for result in results)
+        self.dates.update(result['date'] for result in results if result['date'] is not None)
+
+    def report(self):
+        elapsed = max(time.perf_counter() - self.start, 1e-9)
+        self.stdout.write(
+            f'{self.imported} plików, {self.samples_total} próbek w {elapsed:.1f} s '
+            f'({self.imported / elapsed:.1f} plików/s, {self.samples_total / elapsed:.0f} próbek/s)'
+        )
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from training_app.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index over training descriptions, feelings and coach comments'
+
+    def handle(self, *args, **options):
+        indexed = rebuild_search_index()
+        self.stdout.write(self.style.SUCCESS(f'Odbudowano indeks wyszukiwania ({indexed} treningów).'))
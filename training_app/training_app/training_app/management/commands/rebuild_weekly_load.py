@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from training_app.weekly_load import rebuild_weekly_load
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the weekly training load rollup from trainings and their metrics'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per bulk_create batch')
+
+    def handle(self, *args, **options):
+        created = rebuild_weekly_load(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Odbudowano tabelę obciążeń tygodniowych ({created} wierszy).'))
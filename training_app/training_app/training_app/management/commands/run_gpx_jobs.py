@@ -0,0 +1,90 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.core.management.base import BaseCommand
+from training_app.job_worker import init_worker, run_job
+from training_app.jobs import STALE_JOB_TIMEOUT, claim_jobs, fail_job, requeue_jobs, requeue_stale_jobs
+
+WORKER_CRASHED = 'Proces roboczy zakończył się nieoczekiwanie.'
+
+
+class Command(BaseCommand):
+    help = 'Process queued GPX ingestion and analysis jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help='Number of worker processes')
+        parser.add_argument('--batch-size', type=int, default=20, help='Jobs claimed per polling round')
+        parser.add_argument('--poll-interval', type=float, default=2.0, help='Seconds to wait when the queue is empty')
+        parser.add_argument('--once', action='store_true', help='Exit when the queue is empty')
+
+    def handle(self, *args, **options):
+        requeued = requeue_stale_jobs(STALE_JOB_TIMEOUT)
+        if requeued:
+            self.stdout.write(f'Przywrócono do kolejki {requeued} przerwanych zadań.')
+
+        # zadania przerwane razem z procesem roboczym - przy następnym przejęciu uruchamiane pojedynczo,
+        # żeby zadanie, które samo zabija proces, nie wracało do kolejki w nieskończoność
+        suspects = set()
+        pool = ProcessPoolExecutor(max_workers=options['workers'], initializer=init_worker)
+        try:
+            while True:
+                job_ids = claim_jobs(options['batch_size'])
+                if not job_ids:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                isolated = [job_id for job_id in job_ids if job_id in suspects]
+                for job_id in isolated:
+                    suspects.discard(job_id)
+                    self.run_isolated(job_id)
+
+                unfinished = self.run_batch(pool, [job_id for job_id in job_ids if job_id not in isolated])
+                if unfinished:
+                    # proces potomny zginął (OOM, segfault) - pula jest bezużyteczna, tworzymy nową
+                    requeue_jobs(unfinished)
+                    suspects.update(unfinished)
+                    self.stderr.write(f'Proces roboczy przerwany; do kolejki wraca {len(unfinished)} zadań.')
+                    pool.shutdown(wait=False)
+                    pool = ProcessPoolExecutor(max_workers=options['workers'], initializer=init_worker)
+        finally:
+            pool.shutdown()
+
+        self.stdout.write(self.style.SUCCESS('Kolejka zadań GPX jest pusta.'))
+
+    def run_batch(self, pool, job_ids):
+        """Uruchamia partię zadań w puli; zwraca id zadań niedokończonych przez uszkodzenie puli."""
+        futures = []
+        unfinished = []
+        for job_id in job_ids:
+            try:
+                futures.append((job_id, pool.submit(run_job, job_id)))
+            except BrokenProcessPool:
+                unfinished.append(job_id)
+        for job_id, future in futures:
+            try:
+                self.report(job_id, future.result())
+            except BrokenProcessPool:
+                unfinished.append(job_id)
+            except Exception as exc:
+                # błąd jednego zadania nie może przerwać całej partii
+                self.fail(job_id, str(exc))
+        return unfinished
+
+    def run_isolated(self, job_id):
+        with ProcessPoolExecutor(max_workers=1, initializer=init_worker) as pool:
+            try:
+                self.report(job_id, pool.submit(run_job, job_id).result())
+            except BrokenProcessPool:
+                self.fail(job_id, WORKER_CRASHED)
+            except Exception as exc:
+                self.fail(job_id, str(exc))
+
+    def report(self, job_id, status):
+        self.stdout.write(f'Zadanie {job_id}: {status}')
+
+    def fail(self, job_id, error):
+        fail_job(job_id, error)
+        self.stderr.write(f'Zadanie {job_id}: błąd ({error})')
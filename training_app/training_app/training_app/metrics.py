@@ -0,0 +1,43 @@
+import numpy as np
+
+from .models import TrainingMetrics
+from .zones import calculate_time_in_zones, default_zones_boundaries, format_zones_boundaries
+
+
+def compute_metrics(samples, zones_boundaries=None):
+    """Podsumowanie tętna dla tablicy punktów zwróconej przez ``parse_gpx``."""
+    if zones_boundaries is None:
+        zones_boundaries = default_zones_boundaries()
+    heart_rates = samples['hr']
+    if not heart_rates.size:
+        metrics = dict.fromkeys(['avg_hr', 'max_hr', 'min_hr', 'sample_count', 'duration'], 0)
+        metrics.update((f'zone{i}_time', 0) for i in range(1, len(zones_boundaries) + 2))
+        return metrics
+
+    times = samples['time']
+    if np.isfinite(times[0]) and np.isfinite(times[-1]):
+        duration = int(round(times[-1] - times[0]))
+    else:
+        # bez znaczników czasu zakładamy jedną próbkę na sekundę
+        duration = int(heart_rates.size)
+
+    zone_times = calculate_time_in_zones(heart_rates, zones_boundaries)
+    metrics = {
+        'avg_hr': round(float(heart_rates.mean())),
+        'max_hr': int(heart_rates.max()),
+        'min_hr': int(heart_rates.min()),
+        'sample_count': int(heart_rates.size),
+        'duration': max(duration, 0),
+    }
+    for i, zone_time in enumerate(zone_times, start=1):
+        metrics[f'zone{i}_time'] = int(zone_time)
+    return metrics
+
+
+def save_training_metrics(training, samples, zones_boundaries=None):
+    if zones_boundaries is None:
+        zones_boundaries = default_zones_boundaries()
+    values = compute_metrics(samples, zones_boundaries)
+    values['zones_boundaries'] = format_zones_boundaries(zones_boundaries)
+    metrics, _ = TrainingMetrics.objects.update_or_create(training=training, defaults=values)
+    return metrics
@@ -1,7 +1,10 @@
+from django.core.exceptions import ValidationError
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 from django.contrib.auth.models import AbstractUser, Group, Permission
 
+from .zones import default_zones_boundaries, format_zones_boundaries, karvonen_zones_boundaries
+
 
 class User(AbstractUser):
     ROLA_CHOICES = (
@@ -48,6 +51,15 @@ class Training(models.Model):
     feeling = models.TextField(_('Odczucia zawodnika'), blank=True, null=True)
     coach_comment = models.TextField(_('Komentarz trenera'), blank=True, null=True)
 
+    class Meta:
+        # listy treningów filtrują po zawodniku lub trenerze i sortują malejąco po (data, id);
+        # id w indeksie pozwala paginacji kluczem (keyset.py) czytać zakres bez sortowania
+        indexes = [
+            models.Index(fields=['competitor', '-date', '-id'], name='training_competitor_date_idx'),
+            models.Index(fields=['coach', '-date', '-id'], name='training_coach_date_idx'),
+            models.Index(fields=['coach', 'competitor', '-date', '-id'], name='training_coach_comp_date_idx'),
+        ]
+
     def __str__(self):
         return f"Training on {self.date} - {self.training_type}"
 
@@ -58,3 +70,127 @@ class Diet(models.Model):
 
     def __str__(self):
         return f"Diet for {self.training_type}"
+
+
+class TrainingMetrics(models.Model):
+    training = models.OneToOneField(Training, on_delete=models.CASCADE, related_name='metrics')
+    avg_hr = models.PositiveSmallIntegerField(_('Średnie tętno'), default=0)
+    max_hr = models.PositiveSmallIntegerField(_('Maksymalne tętno'), default=0)
+    min_hr = models.PositiveSmallIntegerField(_('Minimalne tętno'), default=0)
+    sample_count = models.PositiveIntegerField(_('Liczba próbek'), default=0)
+    duration = models.PositiveIntegerField(_('Czas trwania [s]'), default=0)
+    zone1_time = models.PositiveIntegerField(_('Czas w strefie 1 [s]'), default=0)
+    zone2_time = models.PositiveIntegerField(_('Czas w strefie 2 [s]'), default=0)
+    zone3_time = models.PositiveIntegerField(_('Czas w strefie 3 [s]'), default=0)
+    zone4_time = models.PositiveIntegerField(_('Czas w strefie 4 [s]'), default=0)
+    zone5_time = models.PositiveIntegerField(_('Czas w strefie 5 [s]'), default=0)
+    # granice stref, dla których policzono czasy (format_zones_boundaries)
+    zones_boundaries = models.CharField(_('Granice stref'), max_length=100, blank=True, default='')
+    computed_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def zone_times(self):
+        return [self.zone1_time, self.zone2_time, self.zone3_time, self.zone4_time, self.zone5_time]
+
+    def zone_times_for(self, zones_boundaries):
+        """Zapisane czasy w strefach albo ``None``, jeśli policzono je dla innych granic stref."""
+        if self.zones_boundaries != format_zones_boundaries(zones_boundaries):
+            return None
+        return self.zone_times
+
+    def __str__(self):
+        return f"Metrics for {self.training}"
+
+
+class GpxJob(models.Model):
+    STATUS_CHOICES = (
+        ('pending', 'Oczekuje'),
+        ('running', 'W trakcie'),
+        ('done', 'Zakończone'),
+        ('failed', 'Błąd'),
+    )
+    training = models.ForeignKey(Training, on_delete=models.CASCADE, related_name='gpx_jobs')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', db_index=True)
+    error = models.TextField(_('Błąd'), blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"GPX job for {self.training} - {self.get_status_display()}"
+
+
+class ZoneProfile(models.Model):
+    METHOD_CHOICES = (
+        ('percentage', 'Procent tętna maksymalnego'),
+        ('karvonen', 'Karvonen (rezerwa tętna)'),
+    )
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='zone_profile')
+    max_hr = models.PositiveSmallIntegerField(_('Tętno maksymalne'), default=200)
+    resting_hr = models.PositiveSmallIntegerField(_('Tętno spoczynkowe'), blank=True, null=True)
+    method = models.CharField(_('Metoda wyznaczania stref'), max_length=20, choices=METHOD_CHOICES, default='percentage')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def clean(self):
+        if self.method == 'karvonen' and not self.resting_hr:
+            raise ValidationError({'resting_hr': _('Metoda Karvonena wymaga tętna spoczynkowego.')})
+        if self.resting_hr and self.resting_hr >= self.max_hr:
+            raise ValidationError({'resting_hr': _('Tętno spoczynkowe musi być niższe od maksymalnego.')})
+
+    def zones_boundaries(self):
+        if self.method == 'karvonen' and self.resting_hr:
+            return karvonen_zones_boundaries(self.max_hr, self.resting_hr)
+        return default_zones_boundaries(self.max_hr)
+
+    def __str__(self):
+        return f"Zone profile for {self.user}"
+
+
+class WeeklyLoad(models.Model):
+    """Tygodniowe podsumowanie obciążenia zawodnika (aktualizowane sygnałami, odbudowa: rebuild_weekly_load)."""
+    competitor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='weekly_loads')
+    week = models.DateField(_('Początek tygodnia'))
+    sessions = models.PositiveIntegerField(_('Liczba treningów'), default=0)
+    duration = models.PositiveIntegerField(_('Czas trwania [s]'), default=0)
+    zone1_time = models.PositiveIntegerField(_('Czas w strefie 1 [s]'), default=0)
+    zone2_time = models.PositiveIntegerField(_('Czas w strefie 2 [s]'), default=0)
+    zone3_time = models.PositiveIntegerField(_('Czas w strefie 3 [s]'), default=0)
+    zone4_time = models.PositiveIntegerField(_('Czas w strefie 4 [s]'), default=0)
+    zone5_time = models.PositiveIntegerField(_('Czas w strefie 5 [s]'), default=0)
+    # TRIMP: minuty w strefie pomnożone przez numer strefy
+    trimp = models.FloatField(_('Obciążenie (TRIMP)'), default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['competitor', 'week'], name='weekly_load_competitor_week_uniq'),
+        ]
+
+    @property
+    def zone_times(self):
+        return [self.zone1_time, self.zone2_time, self.zone3_time, self.zone4_time, self.zone5_time]
+
+    def __str__(self):
+        return f"Load of {self.competitor} in week {self.week}"
+
+
+class TrainingSamples(models.Model):
+    """
+    Punkty śladu treningu w postaci binarnej (``sample_store.pack_samples``),
+    żeby wykresy i analizy nie musiały ponownie pobierać i parsować pliku GPX.
+    """
+    training = models.OneToOneField(Training, on_delete=models.CASCADE, related_name='samples')
+    # próbki są aktualne, dopóki trening wskazuje ten sam plik
+    gpx_url = models.URLField(_('Link do pliku GPX'), max_length=200, blank=True, default='')
+    content_hash = models.CharField(_('Hash treści GPX'), max_length=64, db_index=True)
+    sample_count = models.PositiveIntegerField(_('Liczba próbek'), default=0)
+    start_time = models.FloatField(_('Czas pierwszej próbki'), blank=True, null=True)
+    hr = models.BinaryField()
+    time_delta = models.BinaryField()
+    lat = models.BinaryField()
+    lon = models.BinaryField()
+    ele = models.BinaryField()
+    created_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Samples for {self.training}"
@@ -0,0 +1,118 @@
+import json
+import logging
+import statistics
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+logger = logging.getLogger('training_app.profiling')
+
+_current_profile = ContextVar('training_app_profile', default=None)
+_history = deque(maxlen=settings.REQUEST_PROFILING_HISTORY)
+_history_lock = threading.Lock()
+
+
+@contextmanager
+def profile_section(name):
+    """Dolicza czas bloku do sekcji ``name`` profilu bieżącego żądania (jeśli profilowanie jest włączone)."""
+    profile = _current_profile.get()
+    if profile is None:
+        yield
+        return
+    stack = profile['stack']
+    stack.append(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        stack.pop()
+        sections = profile['sections']
+        sections[name] = sections.get(name, 0.0) + elapsed_ms
+        # czas sekcji zagnieżdżonej nie jest liczony podwójnie w sekcji nadrzędnej
+        if stack:
+            sections[stack[-1]] = sections.get(stack[-1], 0.0) - elapsed_ms
+
+
+class RequestProfilingMiddleware:
+    """
+    Dla każdego żądania zapisuje czas całkowity, liczbę i czas zapytań SQL oraz
+    czasy sekcji oznaczonych ``profile_section`` (http, xml, zones, bokeh).
+    Włączane ustawieniem ``REQUEST_PROFILING``.
+    """
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_PROFILING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        profile = {'sql_count': 0, 'sql_ms': 0.0, 'sections': {}, 'stack': []}
+        token = _current_profile.set(profile)
+        start = time.perf_counter()
+        try:
+            with connection.execute_wrapper(self.sql_wrapper(profile)):
+                response = self.get_response(request)
+        finally:
+            _current_profile.reset(token)
+        wall_ms = (time.perf_counter() - start) * 1000
+
+        match = getattr(request, 'resolver_match', None)
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match is not None else None,
+            'status': response.status_code,
+            'wall_ms': round(wall_ms, 3),
+            'sql_count': profile['sql_count'],
+            'sql_ms': round(profile['sql_ms'], 3),
+            'sections': {name: round(ms, 3) for name, ms in profile['sections'].items()},
+        }
+        logger.info(json.dumps(record))
+        with _history_lock:
+            _history.append(record)
+        return response
+
+    @staticmethod
+    def sql_wrapper(profile):
+        def wrapper(execute, sql, params, many, context):
+            start = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                profile['sql_count'] += 1
+                profile['sql_ms'] += (time.perf_counter() - start) * 1000
+        return wrapper
+
+
+def profiling_summary():
+    """Średnie i mediany z ostatnich profili, pogrupowane po nazwie widoku."""
+    with _history_lock:
+        records = list(_history)
+
+    by_view = defaultdict(list)
+    for record in records:
+        by_view[record['view'] or record['path']].append(record)
+
+    summary = {}
+    for view, view_records in by_view.items():
+        wall = [record['wall_ms'] for record in view_records]
+        sections = defaultdict(float)
+        for record in view_records:
+            for name, ms in record['sections'].items():
+                sections[name] += ms
+        summary[view] = {
+            'requests': len(view_records),
+            'wall_ms_p50': round(statistics.median(wall), 3),
+            'wall_ms_max': round(max(wall), 3),
+            'sql_count_avg': round(statistics.mean(record['sql_count'] for record in view_records), 2),
+            'sql_ms_avg': round(statistics.mean(record['sql_ms'] for record in view_records), 3),
+            'sections_ms_avg': {name: round(total / len(view_records), 3) for name, total in sections.items()},
+        }
+    return summary
@@ -0,0 +1,123 @@
+import zlib
+
+import numpy as np
+
+from .gpx_parser import TRACKPOINT_DTYPE
+from .models import TrainingSamples
+
+COORD_SCALE = 10 ** 7
+ELE_SCALE = 100
+# długość geograficzna w GPX mieści się w przedziale [-180, 180)
+LON_PERIOD = 360
+# wartość oznaczająca brak współrzędnej/wysokości w kolumnach całkowitoliczbowych
+MISSING = np.iinfo(np.int32).min
+
+
+def _pack(array):
+    return zlib.compress(np.ascontiguousarray(array).tobytes())
+
+
+def _unpack(blob, dtype):
+    return np.frombuffer(zlib.decompress(bytes(blob)), dtype=dtype)
+
+
+def _wrap(values, period):
+    """Sprowadza przeskalowane wartości do przedziału [-period/2, period/2)."""
+    half = period // 2
+    return (values + half) % period - half
+
+
+def _scaled_deltas(values, scale, period=None):
+    """
+    Kolumna zmiennoprzecinkowa jako różnice kolejnych wartości przeskalowanych do int32.
+    Przy ``period`` (długość geograficzna) różnice są zawijane, więc przejście przez
+    południk 180° daje małą różnicę zamiast ~360° przekraczających zakres int32.
+    """
+    missing = ~np.isfinite(values)
+    scaled = np.round(np.where(missing, 0, values) * scale).astype(np.int64)
+    if missing.any():
+        # w miejsce braków wstawiamy ostatnią znaną wartość, żeby różnice pozostały małe
+        last_known = np.maximum.accumulate(np.where(missing, 0, np.arange(len(values))))
+        scaled = scaled[last_known]
+    deltas = np.diff(scaled, prepend=0)
+    if period is not None:
+        deltas = _wrap(deltas, period * scale)
+    deltas[missing] = MISSING
+    return deltas.astype(np.int32)
+
+
+def _restore_scaled(deltas, scale, period=None):
+    missing = deltas == MISSING
+    scaled = np.cumsum(np.where(missing, 0, deltas), dtype=np.int64)
+    if period is not None:
+        scaled = _wrap(scaled, period * scale)
+    values = scaled / scale
+    values[missing] = np.nan
+    return values
+
+
+def pack_samples(samples):
+    """
+    Zamienia tablicę ``TRACKPOINT_DTYPE`` na pola modelu ``TrainingSamples``:
+    tętno jako uint8, czas jako różnice w milisekundach (int32), a szerokość,
+    długość i wysokość jako różnice wartości przeskalowanych do int32. Każda
+    kolumna jest dodatkowo kompresowana zlib; różnice kolejnych próbek są
+    małe, więc kompresują się bardzo dobrze.
+    """
+    times = samples['time']
+    if times.size and np.isfinite(times).all():
+        start_time = float(times[0])
+        offsets = np.round((times - start_time) * 1000).astype(np.int64)
+        time_delta = np.diff(offsets, prepend=0).astype(np.int32)
+    else:
+        # bez kompletnych znaczników czasu zapisujemy pustą kolumnę
+        start_time = None
+        time_delta = np.empty(0, dtype=np.int32)
+
+    return {
+        'sample_count': int(samples.size),
+        'start_time': start_time,
+        'hr': _pack(np.clip(samples['hr'], 0, 255).astype(np.uint8)),
+        'time_delta': _pack(time_delta),
+        'lat': _pack(_scaled_deltas(samples['lat'], COORD_SCALE)),
+        'lon': _pack(_scaled_deltas(samples['lon'], COORD_SCALE, LON_PERIOD)),
+        'ele': _pack(_scaled_deltas(samples['ele'].astype(np.float64), ELE_SCALE)),
+    }
+
+
+def unpack_samples(record):
+    """Odwrotność ``pack_samples``: zwraca tablicę ``TRACKPOINT_DTYPE``."""
+    samples = np.empty(record.sample_count, dtype=TRACKPOINT_DTYPE)
+    samples['hr'] = _unpack(record.hr, np.uint8)
+    time_delta = _unpack(record.time_delta, np.int32)
+    if record.start_time is not None and time_delta.size == record.sample_count:
+        samples['time'] = record.start_time + np.cumsum(time_delta, dtype=np.int64) / 1000
+    else:
+        samples['time'] = np.nan
+    samples['lat'] = _restore_scaled(_unpack(record.lat, np.int32), COORD_SCALE)
+    samples['lon'] = _restore_scaled(_unpack(record.lon, np.int32), COORD_SCALE, LON_PERIOD)
+    samples['ele'] = _restore_scaled(_unpack(record.ele, np.int32), ELE_SCALE)
+    return samples
+
+
+def save_training_samples(training, samples, content_hash):
+    record, _ = TrainingSamples.objects.update_or_create(
+        training=training,
+        defaults={'gpx_url': training.gpx_url or '', 'content_hash': content_hash, **pack_samples(samples)},
+    )
+    return record
+
+
+def _current_samples(training):
+    return TrainingSamples.objects.filter(training=training, gpx_url=training.gpx_url or '')
+
+
+def stored_content_hash(training):
+    """Hash pliku GPX, z którego pochodzą zapisane próbki, albo ``None`` (bez wczytywania danych)."""
+    return _current_samples(training).values_list('content_hash', flat=True).first()
+
+
+def load_training_samples(training):
+    """Zapisane próbki treningu albo ``None``, jeśli ich nie ma lub trening wskazuje inny plik."""
+    record = _current_samples(training).first()
+    return unpack_samples(record) if record is not None else None
@@ -0,0 +1,104 @@
+import re
+
+from django.db import connection, connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import Training
+
+# indeks pełnotekstowy SQLite FTS5; rowid wiersza to id treningu
+FTS_TABLE = 'training_app_training_fts'
+FTS_COLUMNS = ('training_description', 'feeling', 'coach_comment')
+
+WORD_RE = re.compile(r'\w+')
+
+
+def fts_enabled(conn=None):
+    return (conn or connection).vendor == 'sqlite'
+
+
+def create_search_index(using='default'):
+    """Zakłada tabelę FTS5 (jeśli jej nie ma). Wywoływane po migracjach."""
+    conn = connections[using]
+    if not fts_enabled(conn):
+        return
+    with conn.cursor() as cursor:
+        # remove_diacritics pozwala szukać "bol" i znaleźć "ból"
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+            f"{', '.join(FTS_COLUMNS)}, tokenize='unicode61 remove_diacritics 2')"
+        )
+
+
+def index_trainings(trainings):
+    """Wstawia lub podmienia wpisy indeksu dla podanych treningów (np. po bulk_create)."""
+    if not fts_enabled() or not trainings:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [(training.pk,) for training in trainings])
+        cursor.executemany(
+            f"INSERT INTO {FTS_TABLE} (rowid, {', '.join(FTS_COLUMNS)}) VALUES (%s, %s, %s, %s)",
+            [(training.pk, *(getattr(training, column) or '' for column in FTS_COLUMNS)) for training in trainings],
+        )
+
+
+def remove_from_index(training_id):
+    if not fts_enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [training_id])
+
+
+def rebuild_search_index():
+    """Buduje indeks od nowa jednym INSERT ... SELECT. Zwraca liczbę zaindeksowanych treningów."""
+    if not fts_enabled():
+        return 0
+    create_search_index(connection.alias)
+    columns = ', '.join(FTS_COLUMNS)
+    values = ', '.join(f"COALESCE({column}, '')" for column in FTS_COLUMNS)
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, {columns}) SELECT id, {values} FROM {Training._meta.db_table}'
+        )
+        return cursor.rowcount
+
+
+def match_expression(query):
+    """
+    Zamienia tekst z pola wyszukiwania na zapytanie FTS5: każde słowo jako
+    prefiks w cudzysłowie ("kolan"* znajdzie też "kolana"), słowa łączone AND.
+    Cudzysłowy chronią przed błędami składni dla znaków specjalnych FTS5.
+    """
+    words = WORD_RE.findall(query or '')
+    return ' '.join(f'"{word}"*' for word in words) or None
+
+
+def search_trainings(queryset, query, limit):
+    """
+    Najlepiej dopasowane treningi z ``queryset`` (ranking bm25) - co najwyżej
+    ``limit``. Poza SQLite zwykłe wyszukiwanie ``icontains`` sortowane po dacie.
+    """
+    expression = match_expression(query)
+    if expression is None:
+        return []
+    if not fts_enabled():
+        return list(
+            queryset.filter(
+                Q(training_description__icontains=query) | Q(feeling__icontains=query) | Q(coach_comment__icontains=query)
+            ).order_by('-date', '-id')[:limit]
+        )
+
+    # FTS5 wybiera pasujące wiersze, a filtry listy sprawdzamy dla każdego z nich po kluczu głównym;
+    # warunek "rowid IN (...)" FTS5 wykonywałby jako osobne wyszukiwanie dla każdego id
+    scope = queryset.order_by().filter(pk=RawSQL(f'{FTS_TABLE}.rowid', ())).values('pk')
+    scope_sql, scope_params = scope.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND EXISTS ({scope_sql}) '
+            f'ORDER BY rank LIMIT %s',
+            [expression, *scope_params, limit],
+        )
+        ids = [row[0] for row in cursor.fetchall()]
+    trainings = queryset.in_bulk(ids)
+    return [trainings[pk] for pk in ids if pk in trainings]
@@ -46,6 +46,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "training_app.profiling.RequestProfilingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -125,3 +126,89 @@ STATIC_URL = "static/"
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+# Lokalna kopia plików GPX (cache adresowany treścią, LRU ograniczone rozmiarem)
+GPX_CACHE_DIR = BASE_DIR / "gpx_cache"
+GPX_CACHE_MAX_BYTES = 500 * 1024 * 1024
+# przez ten czas (w sekundach) kopia jest używana bez pytania serwera o ETag/Last-Modified
+GPX_CACHE_MAX_AGE = 60 * 60
+GPX_FETCH_TIMEOUT = 15
+# asynchroniczne pobieranie GPX (httpx) - warto włączyć przy uruchomieniu przez ASGI
+GPX_ASYNC_VIEWS = False
+GPX_FETCH_MAX_CONCURRENCY = 8
+
+# Maksymalna liczba punktów na wykresie tętna (LTTB); 0 wyłącza zmniejszanie
+HR_CHART_MAX_POINTS = 2000
+
+# Wykresy tętna w szczegółach treningu rysuje przeglądarka (BokehJS) z danych JSON
+# pobieranych z /training/<id>/data/; False przywraca osadzanie gotowych dokumentów Bokeh
+HR_CHARTS_CLIENT_SIDE = True
+
+# Jak długo (w sekundach) proces trzyma w pamięci granice stref z ZoneProfile; zmiana profilu
+# podbija wersję w LOOKUP_VERSION_CACHE, więc pozostałe procesy widzą ją przy następnym odczycie
+ZONE_PROFILE_CACHE_TTL = 60
+
+# Przetworzone dane z plików GPX trzymamy po stronie serwera, w sesji jest tylko token
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "analysis": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": BASE_DIR / "analysis_cache",
+        "OPTIONS": {"MAX_ENTRIES": 1000},
+    },
+    "charts": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": BASE_DIR / "chart_cache",
+        "OPTIONS": {"MAX_ENTRIES": 2000},
+    },
+    # wersje słowników z lookups.py - muszą być wspólne dla wszystkich procesów
+    "lookups": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": BASE_DIR / "lookup_cache",
+    },
+}
+ANALYSIS_STORE_CACHE = "analysis"
+ANALYSIS_STORE_TTL = 60 * 60
+
+# Gotowe fragmenty wykresów Bokeh (klucz: trening, hash pliku GPX, granice stref)
+CHART_CACHE = "charts"
+CHART_CACHE_TTL = 24 * 60 * 60
+
+# Liczba treningów na stronie listy (parametr ?per_page=, ograniczony przez TRAINING_PAGE_SIZE_MAX)
+TRAINING_PAGE_SIZE = 5
+TRAINING_PAGE_SIZE_MAX = 100
+TRAINING_PAGE_SIZE_CHOICES = [5, 20, 50, 100]
+
+# Rodzaje treningów, lista trenerów (lookups.py) i granice stref (zone_profiles.py) trzymane
+# w pamięci procesu. Sygnały podbijają
+# wersję w LOOKUP_VERSION_CACHE, więc cache musi być współdzielony przez procesy (plik, Redis,
+# memcached); TTL ogranicza nieaktualność, gdyby wersja zaginęła (np. wyczyszczony cache)
+LOOKUP_VERSION_CACHE = "lookups"
+LOOKUP_CACHE_TTL = 5 * 60
+
+# Maksymalna liczba wyników wyszukiwania pełnotekstowego (?q=) na liście treningów trenera
+TRAINING_SEARCH_LIMIT = 100
+
+# Domyślny zakres (w tygodniach) panelu podsumowań trenera
+COACH_DASHBOARD_WEEKS = 12
+
+# Liczba wierszy pobieranych naraz przy strumieniowym eksporcie CSV
+CSV_EXPORT_CHUNK_SIZE = 2000
+
+# Profilowanie żądań (czas całkowity, SQL, pobieranie GPX, parsowanie XML, NumPy, Bokeh).
+# Wyniki trafiają do loggera training_app.profiling i pod /profiling/ (tylko dla personelu).
+REQUEST_PROFILING = False
+REQUEST_PROFILING_HISTORY = 1000
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "training_app.profiling": {"handlers": ["console"], "level": "INFO", "propagate": False},
+    },
+}
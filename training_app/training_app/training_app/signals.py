@@ -0,0 +1,95 @@
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .jobs import enqueue_gpx_jobs
+from .lookups import invalidate_lookup
+from .models import Training, TrainingMetrics, TrainingType, User, ZoneProfile
+from .search import create_search_index, index_trainings, remove_from_index
+from .weekly_load import refresh_weekly_load, week_start
+from .zone_profiles import invalidate_zones_boundaries
+from .zones import default_zones_boundaries, format_zones_boundaries
+
+
+def enqueue_zone_recompute(user_id, zones_boundaries):
+    """Kolejkuje ponowną analizę treningów zawodnika, których czasy w strefach policzono dla innych granic."""
+    # treningi z importu GPX nie mają linku, ale mają zapisane próbki
+    has_track = Q(samples__isnull=False) | (Q(gpx_url__isnull=False) & ~Q(gpx_url=''))
+    trainings = Training.objects.filter(has_track, competitor_id=user_id)
+    return enqueue_gpx_jobs(trainings.exclude(metrics__zones_boundaries=format_zones_boundaries(zones_boundaries)))
+
+
+@receiver(post_save, sender=ZoneProfile)
+def zone_profile_saved(sender, instance, **kwargs):
+    invalidate_zones_boundaries(instance.user_id)
+    enqueue_zone_recompute(instance.user_id, instance.zones_boundaries())
+
+
+@receiver(post_delete, sender=ZoneProfile)
+def zone_profile_deleted(sender, instance, **kwargs):
+    invalidate_zones_boundaries(instance.user_id)
+    enqueue_zone_recompute(instance.user_id, default_zones_boundaries())
+
+
+def _training_week(competitor_id, day):
+    # data może być jeszcze napisem z formularza (np. Training.objects.create(date='2024-05-01'))
+    day = Training._meta.get_field('date').to_python(day)
+    return (competitor_id, week_start(day)) if day is not None else None
+
+
+@receiver(pre_save, sender=Training)
+def remember_training_week(sender, instance, **kwargs):
+    previous = None
+    if instance.pk is not None:
+        previous = Training.objects.filter(pk=instance.pk).values_list('competitor_id', 'date').first()
+    instance._previous_week = _training_week(*previous) if previous else None
+
+
+@receiver(post_save, sender=Training)
+def training_saved(sender, instance, **kwargs):
+    current = _training_week(instance.competitor_id, instance.date)
+    previous = getattr(instance, '_previous_week', None)
+    for competitor_week in {current, previous} - {None}:
+        refresh_weekly_load(*competitor_week)
+
+
+@receiver(post_delete, sender=Training)
+def training_deleted(sender, instance, **kwargs):
+    refresh_weekly_load(instance.competitor_id, Training._meta.get_field('date').to_python(instance.date))
+
+
+@receiver(post_save, sender=TrainingMetrics)
+@receiver(post_delete, sender=TrainingMetrics)
+def training_metrics_changed(sender, instance, **kwargs):
+    training = Training.objects.filter(pk=instance.training_id).values_list('competitor_id', 'date').first()
+    if training is not None:
+        refresh_weekly_load(*training)
+
+
+def create_search_table(sender, using, **kwargs):
+    create_search_index(using)
+
+
+@receiver(post_save, sender=Training)
+def index_training(sender, instance, **kwargs):
+    index_trainings([instance])
+
+
+@receiver(post_delete, sender=Training)
+def unindex_training(sender, instance, **kwargs):
+    remove_from_index(instance.pk)
+
+
+@receiver(post_save, sender=TrainingType)
+@receiver(post_delete, sender=TrainingType)
+def training_type_changed(sender, **kwargs):
+    invalidate_lookup('training_types')
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, update_fields=None, **kwargs):
+    # logowanie zapisuje tylko last_login - lista trenerów się nie zmienia
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    invalidate_lookup('coaches')
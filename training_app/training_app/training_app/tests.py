@@ -0,0 +1,319 @@
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from functools import partial
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import path, reverse
+
+from . import gpx_cache as gpx_cache_module
+from .gpx_cache import GpxCache, afetch_gpx
+from .gpx_parser import TRACKPOINT_DTYPE
+from .lookups import bump_version, coaches, invalidate_lookups, training_types
+from .management.commands.benchmark_endpoints import QuietFixtureHandler, write_fixture_gpx
+from .models import GpxJob, Training, TrainingMetrics, TrainingSamples, TrainingType, User, ZoneProfile
+from .sample_store import pack_samples, unpack_samples
+from .urls import urlpatterns as app_urlpatterns
+from .views import TrenerTrainingDetailAsyncView, ZawodnikAsyncView
+from .zone_profiles import _version_key as zone_profile_version_key
+from .zone_profiles import get_zones_boundaries
+from .zones import default_zones_boundaries, format_zones_boundaries
+
+# adresy projektu z widokami asynchronicznymi, jak przy GPX_ASYNC_VIEWS = True
+urlpatterns = [
+    path('zawodnik/', ZawodnikAsyncView.as_view(), name='zawodnik'),
+    path('trener/training/<int:pk>/', TrenerTrainingDetailAsyncView.as_view(), name='trener_training_detail'),
+] + app_urlpatterns
+
+# osobne cache w pamięci, żeby testy nie korzystały z katalogów cache projektu
+TEST_CACHES = {
+    alias: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': f'tests-{alias}'}
+    for alias in ('default', 'analysis', 'charts', 'lookups')
+}
+
+
+@override_settings(CACHES=TEST_CACHES)
+class TrainingListQueriesTests(TestCase):
+    """Liczba zapytań list treningów nie może zależeć od rozmiaru ani numeru strony."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.coach = User.objects.create_user('trener', password='x', name='Jan', surname='Trener', role='coach')
+        cls.competitor = User.objects.create_user('zawodnik', password='x', name='Anna', surname='Nowak', role='competitor')
+        training_types = [TrainingType.objects.create(training_type=choice) for choice, _ in TrainingType.TRAINING_CHOICES]
+        start = date(2024, 1, 1)
+        trainings = Training.objects.bulk_create(
+            Training(
+                training_type=training_types[i % len(training_types)],
+                # część treningów bez daty - trafia na koniec listy
+                date=start + timedelta(days=i // 2) if i % 10 else None,
+                training_description=f'Trening {i}',
+                coach=cls.coach,
+                competitor=cls.competitor,
+            )
+            for i in range(250)
+        )
+        TrainingMetrics.objects.bulk_create(
+            TrainingMetrics(training=training, avg_hr=140, max_hr=180, min_hr=100) for training in trainings[::2]
+        )
+        GpxJob.objects.bulk_create(GpxJob(training=training, status='done') for training in trainings[::3])
+
+    def setUp(self):
+        # słowniki z lookups.py są wczytywane raz na proces, więc liczymy zapytania po ich wczytaniu
+        invalidate_lookups()
+        training_types()
+        coaches()
+
+    def assertPageQueries(self, user, url_name, page_name, per_page, num, last_num):
+        """Pierwsza, następna i ostatnia strona (``?cursor=``) listy ``url_name``."""
+        self.client.force_login(user)
+        url = reverse(url_name)
+        with self.assertNumQueries(num):
+            response = self.client.get(url, {'per_page': per_page})
+        page = response.context[page_name]
+        self.assertEqual(len(page), per_page)
+        self.assertTrue(page.has_next)
+
+        with self.assertNumQueries(num):
+            response = self.client.get(url, {'cursor': page.next_cursor})
+        self.assertEqual(len(response.context[page_name]), per_page)
+        self.assertTrue(response.context[page_name].has_previous)
+
+        with self.assertNumQueries(last_num):
+            response = self.client.get(url, {'cursor': page.last_cursor})
+        last_page = response.context[page_name]
+        self.assertEqual(len(last_page), per_page)
+        self.assertFalse(last_page.has_next)
+
+    # sesja, użytkownik, strona treningów, lista zawodników trenera; ostatnia strona przy 100
+    # treningach obejmuje też treningi z datą, więc wymaga zapytania o drugi segment listy
+
+    def test_trener_list_per_page_5(self):
+        self.assertPageQueries(self.coach, 'trener', 'trainings', 5, 4, 4)
+
+    def test_trener_list_per_page_100(self):
+        self.assertPageQueries(self.coach, 'trener', 'trainings', 100, 4, 5)
+
+    # sesja, użytkownik, strona treningów
+
+    def test_zawodnik_list_per_page_5(self):
+        self.assertPageQueries(self.competitor, 'zawodnik', 'athlete_trainings', 5, 3, 3)
+
+    def test_zawodnik_list_per_page_100(self):
+        self.assertPageQueries(self.competitor, 'zawodnik', 'athlete_trainings', 100, 3, 4)
+
+
+class SampleStoreTests(SimpleTestCase):
+
+    def round_trip(self, lat, lon):
+        samples = np.zeros(len(lon), dtype=TRACKPOINT_DTYPE)
+        samples['time'] = 1714550400 + np.arange(len(lon))
+        samples['hr'] = 140
+        samples['lat'] = lat
+        samples['lon'] = lon
+        samples['ele'] = 10
+        return unpack_samples(TrainingSamples(**pack_samples(samples)))
+
+    def test_lon_crossing_antimeridian(self):
+        lon = [179.99, -179.99, -179.98, 179.97, -180.0]
+        restored = self.round_trip([-16.5] * len(lon), lon)
+        np.testing.assert_allclose(restored['lon'], lon, atol=1e-7)
+
+    def test_missing_coordinates(self):
+        lon = [179.99, np.nan, -179.99, 0.5]
+        restored = self.round_trip([64.1, np.nan, 64.2, 89.9], lon)
+        np.testing.assert_allclose(restored['lon'], lon, atol=1e-7)
+        np.testing.assert_allclose(restored['lat'], [64.1, np.nan, 64.2, 89.9], atol=1e-7)
+
+
+class RecordingFixtureHandler(QuietFixtureHandler):
+    """
+    Serwuje pliki z katalogu i zapisuje (ścieżka, status) odpowiedzi. Przy ``server.delay``
+    zamyka połączenie po tym czasie bez odpowiedzi, jak przeciążony serwer trackera.
+    """
+
+    def do_GET(self):
+        if self.server.delay:
+            time.sleep(self.server.delay)
+            return
+        super().do_GET()
+
+    def log_request(self, code='-', size='-'):
+        self.server.requests.append((self.path, int(code)))
+
+
+class GpxServerTestMixin:
+    """Lokalny serwer HTTP z plikiem GPX i osobny GpxCache w katalogu tymczasowym dla każdego testu."""
+
+    gpx_cache_max_age = 60 * 60
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.fixtures_dir = tempfile.TemporaryDirectory()
+        write_fixture_gpx(Path(cls.fixtures_dir.name) / 'track.gpx', 600)
+        cls.server = ThreadingHTTPServer(
+            ('127.0.0.1', 0), partial(RecordingFixtureHandler, directory=cls.fixtures_dir.name)
+        )
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        host, port = cls.server.server_address
+        cls.gpx_url = f'http://{host}:{port}/track.gpx'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        cls.fixtures_dir.cleanup()
+        super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+        self.server.delay = 0
+        self.server.requests = []
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        self.gpx_cache = GpxCache(cache_dir.name, 50 * 1024 * 1024, self.gpx_cache_max_age)
+        patcher = mock.patch.object(gpx_cache_module, 'gpx_cache', self.gpx_cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+class AsyncFetchGpxTests(GpxServerTestMixin, TestCase):
+    # każde pobranie rewaliduje kopię z cache
+    gpx_cache_max_age = 0
+
+    @override_settings(GPX_FETCH_TIMEOUT=0.2)
+    async def test_timeout_without_cached_copy(self):
+        self.server.delay = 1
+        self.assertIsNone(await afetch_gpx(self.gpx_url))
+
+    @override_settings(GPX_FETCH_TIMEOUT=0.2)
+    async def test_timeout_returns_stale_copy(self):
+        gpx_path = await afetch_gpx(self.gpx_url)
+        self.assertIsNotNone(gpx_path)
+        self.server.delay = 1
+        self.assertEqual(await afetch_gpx(self.gpx_url), gpx_path)
+
+    async def test_revalidation_not_modified(self):
+        gpx_path = await afetch_gpx(self.gpx_url)
+        fetched_at = self.gpx_cache.lookup(self.gpx_url)['fetched_at']
+
+        self.assertEqual(await afetch_gpx(self.gpx_url), gpx_path)
+        self.assertEqual(self.server.requests, [('/track.gpx', 200), ('/track.gpx', 304)])
+        self.assertGreater(self.gpx_cache.lookup(self.gpx_url)['fetched_at'], fetched_at)
+
+
+@override_settings(CACHES=TEST_CACHES, ROOT_URLCONF=__name__)
+# widoki asynchroniczne mają korzystać wyłącznie z afetch_gpx
+@mock.patch('training_app.views.fetch_gpx', side_effect=AssertionError('synchroniczne pobranie pliku GPX'))
+class AsyncGpxViewsTests(GpxServerTestMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.coach = User.objects.create_user('trener', password='x', name='Jan', surname='Trener', role='coach')
+        cls.competitor = User.objects.create_user('zawodnik', password='x', name='Anna', surname='Nowak', role='competitor')
+        cls.training_type = TrainingType.objects.create(training_type='intervals')
+
+    def setUp(self):
+        super().setUp()
+        invalidate_lookups()
+
+    async def test_zawodnik_load(self, fetch_gpx):
+        await sync_to_async(self.async_client.force_login)(self.competitor)
+        response = await self.async_client.post(reverse('zawodnik'), {
+            'action': 'load',
+            'gpx_url': self.gpx_url,
+            'age': '30',
+            'training_type': str(self.training_type.pk),
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['gpx_url'], self.gpx_url)
+        self.assertEqual(sum(response.context['zone_times']), 600)
+        self.assertEqual(self.server.requests, [('/track.gpx', 200)])
+
+    async def test_zawodnik_list(self, fetch_gpx):
+        await sync_to_async(self.async_client.force_login)(self.competitor)
+        response = await self.async_client.get(reverse('zawodnik'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.server.requests, [])
+
+    @override_settings(HR_CHARTS_CLIENT_SIDE=False)
+    async def test_trener_training_detail(self, fetch_gpx):
+        training = await Training.objects.acreate(
+            training_type=self.training_type,
+            date=date(2024, 5, 1),
+            gpx_url=self.gpx_url,
+            coach=self.coach,
+            competitor=self.competitor,
+        )
+        await sync_to_async(self.async_client.force_login)(self.coach)
+        url = reverse('trener_training_detail', args=[training.pk])
+
+        response = await self.async_client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sum(response.context['zone_times']), 600)
+        self.assertTrue(await TrainingSamples.objects.filter(training=training).aexists())
+
+        # zapisane próbki - plik nie jest pobierany ponownie
+        response = await self.async_client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.server.requests, [('/track.gpx', 200)])
+
+    async def test_trener_training_detail_missing(self, fetch_gpx):
+        await sync_to_async(self.async_client.force_login)(self.coach)
+        response = await self.async_client.get(reverse('trener_training_detail', args=[0]))
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.server.requests, [])
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ZonesBoundariesTests(GpxServerTestMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.competitor = User.objects.create_user('zawodnik', password='x', name='Anna', surname='Nowak', role='competitor')
+        cls.training_type = TrainingType.objects.create(training_type='intervals')
+
+    def setUp(self):
+        super().setUp()
+        invalidate_lookups()
+        self.client.force_login(self.competitor)
+
+    def load_and_save(self, age):
+        self.client.post(reverse('zawodnik'), {'action': 'load', 'gpx_url': self.gpx_url, 'age': age})
+        self.client.post(reverse('zawodnik'), {
+            'action': 'save',
+            'gpx_url': self.gpx_url,
+            'training_type': str(self.training_type.pk),
+            'training_date': '2024-05-01',
+        })
+        return TrainingMetrics.objects.get(training__competitor=self.competitor)
+
+    def test_save_uses_age_from_preview(self):
+        metrics = self.load_and_save('30')
+        self.assertEqual(metrics.zones_boundaries, format_zones_boundaries(default_zones_boundaries(190)))
+
+    def test_save_reads_profile_from_database(self):
+        profile = ZoneProfile.objects.create(user=self.competitor, max_hr=180)
+        self.assertEqual(get_zones_boundaries(self.competitor.pk), default_zones_boundaries(180))
+        # zmiana w innym procesie: w tym procesie nie ma sygnału, cache ma starą kopię
+        ZoneProfile.objects.filter(pk=profile.pk).update(max_hr=170)
+
+        metrics = self.load_and_save('30')
+        self.assertEqual(metrics.zones_boundaries, format_zones_boundaries(default_zones_boundaries(170)))
+
+    def test_cache_follows_shared_version(self):
+        profile = ZoneProfile.objects.create(user=self.competitor, max_hr=180)
+        self.assertEqual(get_zones_boundaries(self.competitor.pk), default_zones_boundaries(180))
+        ZoneProfile.objects.filter(pk=profile.pk).update(max_hr=170)
+        self.assertEqual(get_zones_boundaries(self.competitor.pk), default_zones_boundaries(180))
+
+        # sygnał w procesie, który zapisał profil, podbija wspólną wersję
+        bump_version(zone_profile_version_key(self.competitor.pk))
+        self.assertEqual(get_zones_boundaries(self.competitor.pk), default_zones_boundaries(170))
@@ -1,7 +1,15 @@
+from django.conf import settings
 from django.contrib.auth import views as auth_views
 from django.contrib import admin
 from django.urls import path
 from .views import RegisterView, LoginView, HomeView, ZawodnikView,CustomLogoutView,TrenerView, TrenerTrainingDetailView
+from .views import ZawodnikAsyncView, TrenerTrainingDetailAsyncView, TrainingJobStatusView, ProfilingSummaryView
+from .views import TrainingChartDataView, TrainingChartDataAsyncView, TrenerDashboardView
+
+# przy wdrożeniu ASGI widoki pobierające pliki GPX mogą działać asynchronicznie
+if settings.GPX_ASYNC_VIEWS:
+    ZawodnikView, TrenerTrainingDetailView = ZawodnikAsyncView, TrenerTrainingDetailAsyncView
+    TrainingChartDataView = TrainingChartDataAsyncView
 
 urlpatterns = [
     path("admin/", admin.site.urls),
@@ -11,6 +19,10 @@ urlpatterns = [
     path('home/', HomeView.as_view(), name='home'),
     path('zawodnik/', ZawodnikView.as_view(), name='zawodnik'),
     path('trener/', TrenerView.as_view(), name='trener'),
+    path('trener/dashboard/', TrenerDashboardView.as_view(), name='trener_dashboard'),
     path('trener/training/<int:pk>/', TrenerTrainingDetailView.as_view(), name='trener_training_detail'),
+    path('training/<int:pk>/data/', TrainingChartDataView.as_view(), name='training_chart_data'),
+    path('training/<int:pk>/job/', TrainingJobStatusView.as_view(), name='training_job_status'),
+    path('profiling/', ProfilingSummaryView.as_view(), name='profiling_summary'),
     # path('training_type/', TrainingTypeView.as_view(), name='training_type'),
 ]
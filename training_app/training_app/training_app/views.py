@@ -1,26 +1,48 @@
-import requests
-import xml.etree.ElementTree as ET
+import asyncio
+import hashlib
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth import login, authenticate
 from django.contrib.auth.forms import AuthenticationForm
-from django.http import HttpResponse
+from django.http import Http404, JsonResponse, StreamingHttpResponse
 from django.shortcuts import redirect, render
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.dateparse import parse_date
+from django.utils.http import quote_etag
 from django.views import View
 from django.views.generic import FormView
-from bokeh.plotting import figure
 from bokeh.embed import components
-from bokeh.resources import CDN
-from bokeh.models import ColumnDataSource, Range1d
-import numpy as np
+from bokeh.resources import CDN, Resources
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.views import LogoutView
+from django.utils.decorators import method_decorator
+from .analysis_store import discard_analysis, load_analysis, store_analysis
+from .dashboard import coach_dashboard
+from .charts import (
+    chart_cache_key, chart_data_cache_key, create_hr_line_chart, create_zone_time_chart, get_cached_charts,
+    hr_chart_data, set_cached_charts,
+)
 from .forms import UserRegistrationForm
-from .models import User, Training, TrainingType
-from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
+from .gpx_cache import afetch_gpx, fetch_gpx
+from .gpx_parser import parse_gpx
+from .jobs import enqueue_gpx_job, with_job_status
+from .lookups import coaches, get_coach, get_training_type, training_types
+from .keyset import KeysetPage, cursor_state, decode_cursor, keyset_page
+from .metrics import save_training_metrics
+from .models import GpxJob, User, Training, TrainingSamples
+from .profiling import profile_section, profiling_summary
+from .search import search_trainings
+from .sample_store import load_training_samples, save_training_samples, stored_content_hash
+from .zone_profiles import current_zones_boundaries, get_zones_boundaries
+from .zones import classify_zones
 import csv
-from django.db.models import Min, Max
+from django.db.models import Q
 from django.shortcuts import render, get_object_or_404
-from bokeh.models import HoverTool
+
+# BokehJS z API do budowania wykresów w przeglądarce (HR_CHARTS_CLIENT_SIDE)
+BOKEH_API_JS = Resources(mode='cdn', components=['bokeh', 'bokeh-api']).js_files
 
 class RegisterView(FormView):
     template_name = 'register.html'
@@ -68,52 +90,129 @@ class HomeView(View):
     def get(self, request):
         return render(request, 'home.html')
 
-def calculate_time_in_zones(heart_rates, zones_boundaries):
-    zone_times = [0] * (len(zones_boundaries) + 1)
-    for hr in heart_rates:
-        for i, boundary in enumerate(zones_boundaries):
-            if hr < boundary:
-                zone_times[i] += 1
-                break
-        else:
-            zone_times[-1] += 1
-    return zone_times
-
-def create_zone_time_chart(zone_times, zones_boundaries):
-    colors = ['blue', 'green', '#FFD700', 'orange', 'red', 'purple']
-    zone_labels = ['1', '2', '3', '4', '5']
-    
-    # sekundy na minuty
-    zone_times_in_minutes = [time / 60 for time in zone_times]
-    
-    source = ColumnDataSource(data=dict(zones=zone_labels, times=zone_times_in_minutes, colors=colors))
-
-    p = figure(x_range=zone_labels, title="Czas spędzony w strefach tętna",height = 400, toolbar_location=None, tools="")
-    p.vbar(x='zones', top='times', width=0.9, color='colors', source=source)
-    hover = HoverTool(
-            tooltips=[
-                ("Strefa", "@zones"),
-                ("Czas", "@times min"),
-            ]
-    )
-    p.add_tools(hover)
+class Echo:
+    """Pseudo-bufor dla csv.writer: zwraca zapisany wiersz zamiast go przechowywać."""
 
-    p.xgrid.grid_line_color = None
-    p.y_range.start = 0
-    p.xaxis.axis_label = "Strefy tętna"
-    p.yaxis.axis_label = "Czas [min]"
+    def write(self, value):
+        return value
 
-    return p
 
+def training_csv_response(trainings, filename):
+    rows = trainings.values_list(
+        'date', 'training_type__training_type', 'training_description', 'gpx_url', 'feeling',
+        'coach_id', 'coach__name', 'coach__surname',
+    )
+    writer = csv.writer(Echo(), delimiter=';')
+
+    def stream():
+        yield '\ufeff'
+        yield writer.writerow(['Data', 'Rodzaj treningu', 'Opis', 'Link do GPX', 'Odczucia', 'Trener'])
+        for date, training_type, description, gpx_url, feeling, coach_id, coach_name, coach_surname in rows.iterator(
+                chunk_size=settings.CSV_EXPORT_CHUNK_SIZE):
+            yield writer.writerow([
+                date,
+                training_type if training_type else 'Brak',
+                description if description else '',
+                gpx_url if gpx_url else '',
+                feeling if feeling else '',
+                f"{coach_name} {coach_surname}".strip() if coach_id else 'Brak'
+            ])
 
-class ZawodnikView(View):
+    response = StreamingHttpResponse(stream(), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def get_page_size(request):
+    try:
+        page_size = int(request.GET.get('per_page', settings.TRAINING_PAGE_SIZE))
+    except ValueError:
+        page_size = settings.TRAINING_PAGE_SIZE
+    return min(max(page_size, 1), settings.TRAINING_PAGE_SIZE_MAX)
+
+
+def list_state(request, filter_names):
+    """
+    Filtry, rozmiar strony i pozycja listy treningów - z tokenu ``cursor``
+    (linki paginacji) albo z parametrów formularza filtrów.
+    """
+    state = decode_cursor(request.GET.get('cursor'))
+    if state is None:
+        filters = {name: request.GET.get(name) for name in filter_names}
+        state = cursor_state(filters, get_page_size(request), bool(request.GET.get('count')))
+    state['per_page'] = min(max(state['per_page'], 1), settings.TRAINING_PAGE_SIZE_MAX)
+    return state
+
+
+def parse_date_filter(value):
+    if not value or value.lower() == 'none':
+        return None
+    try:
+        return parse_date(value)
+    except ValueError:
+        return None
+
+
+class GpxFetchMixin:
+    def fetch_gpx(self, gpx_url):
+        prefetched = getattr(self, 'prefetched_gpx', {})
+        if gpx_url in prefetched:
+            return prefetched[gpx_url]
+        return fetch_gpx(gpx_url)
+
+    def training_samples_source(self, training):
+        """
+        Zwraca ``(hash treści GPX, funkcja wczytująca próbki)``. Zapisane próbki
+        (``TrainingSamples``) mają pierwszeństwo; bez nich plik GPX jest pobierany,
+        parsowany i od razu zapisywany. ``(None, None)``, gdy danych nie ma.
+        Próbki wczytuje się dopiero przy braku gotowych wykresów w cache.
+        """
+        content_hash = stored_content_hash(training)
+        if content_hash is not None:
+            return content_hash, lambda: load_training_samples(training)
+
+        gpx_path = self.fetch_gpx(training.gpx_url)
+        if gpx_path is None:
+            return None, None
+
+        def parse_and_store():
+            samples = parse_gpx(gpx_path)
+            save_training_samples(training, samples, gpx_path.stem)
+            return samples
+        return gpx_path.stem, parse_and_store
+
+
+class AsyncGpxFetchMixin(GpxFetchMixin):
+    """
+    Pobiera pliki GPX asynchronicznie (httpx, wspólna pula połączeń) przed
+    przekazaniem żądania do synchronicznej logiki widoku, więc wolne API
+    trackera nie blokuje wątku roboczego.
+    """
+
+    async def prefetch_gpx(self, *gpx_urls):
+        gpx_paths = await asyncio.gather(*(afetch_gpx(gpx_url) for gpx_url in gpx_urls))
+        self.prefetched_gpx = dict(zip(gpx_urls, gpx_paths))
+
+    async def prefetch_training_gpx(self, trainings):
+        """Pobiera plik GPX treningu z querysetu, o ile trening nie ma już zapisanych próbek."""
+        training = await trainings.values('pk', 'gpx_url').afirst()
+        if training is None or not training['gpx_url']:
+            return
+        if not await TrainingSamples.objects.filter(training_id=training['pk'], gpx_url=training['gpx_url']).aexists():
+            await self.prefetch_gpx(training['gpx_url'])
+
+
+class ZawodnikView(GpxFetchMixin, View):
 
     def get(self, request):
-        date_from = request.GET.get('date_from')
-        date_to = request.GET.get('date_to')
-        training_type_filter = request.GET.get('training_type_filter')
+        state = list_state(request, ('date_from', 'date_to', 'training_type_filter'))
+        date_from = state['filters'].get('date_from')
+        date_to = state['filters'].get('date_to')
+        training_type_filter = state['filters'].get('training_type_filter')
 
-        athlete_trainings = Training.objects.filter(competitor=request.user).order_by('-date')
+        athlete_trainings = with_job_status(
+            Training.objects.filter(competitor=request.user).select_related('training_type', 'coach', 'metrics')
+        ).order_by('-date', '-id')
 
         if date_from and date_from.lower() != 'none':
             athlete_trainings = athlete_trainings.filter(date__gte=date_from)
@@ -122,67 +221,46 @@ class ZawodnikView(View):
         if training_type_filter and training_type_filter.lower() != 'none':
             athlete_trainings = athlete_trainings.filter(training_type_id=training_type_filter)
 
-        paginator = Paginator(athlete_trainings, 5)  
-        page_number = request.GET.get('page', 1)
-        page_obj = paginator.get_page(page_number)
+        if 'download_csv' in request.GET:
+            return self.generate_csv_report(athlete_trainings, training_type_filter, date_from, date_to)
 
         context = {
-            'available_training_types': TrainingType.objects.all(),
-            'available_coaches': User.objects.filter(role='coach'),
+            'available_training_types': training_types(),
+            'available_coaches': coaches(),
             'competitor': request.user,
-            'athlete_trainings': page_obj,
+            'athlete_trainings': keyset_page(athlete_trainings, state),
             'date_from': date_from,
             'date_to': date_to,
-            'training_type_filter': training_type_filter
+            'training_type_filter': training_type_filter,
+            'per_page': state['per_page'],
+            'show_count': state['count'],
+            'page_size_choices': settings.TRAINING_PAGE_SIZE_CHOICES,
         }
 
-        if 'download_csv' in request.GET:
-            return self.generate_csv_report(athlete_trainings, training_type_filter, date_from, date_to)
-
         return render(request, 'zawodnik.html', context)
 
     def generate_csv_report(self, athlete_trainings, training_type_filter, date_from, date_to):
-        response = HttpResponse(content_type='text/csv; charset=utf-8') 
         filename = 'training_report_'
-        response.write('\ufeff'.encode('utf8'))
 
         if training_type_filter and training_type_filter.lower() != 'none':
-            training_type = TrainingType.objects.filter(id=training_type_filter).first()
+            training_type = get_training_type(training_type_filter)
             if training_type:
                 filename += f'{training_type.training_type}_'
 
         if (date_from and date_from.lower() != 'none') and (date_to and date_to.lower() != 'none'):
             filename += f'{date_from}_{date_to}.csv'
         else:
-            min_date = Training.objects.filter(competitor=self.request.user).aggregate(Min('date'))['date__min']
-            max_date = Training.objects.filter(competitor=self.request.user).aggregate(Max('date'))['date__max']
-            if not date_from or date_from.lower() == 'none':
-                date_from = min_date
-            if not date_to or date_to.lower() == 'none':
-                date_to = max_date
             filename += 'all.csv'
 
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
-
-        writer = csv.writer(response, delimiter=';')
-        writer.writerow(['Data', 'Rodzaj treningu', 'Opis', 'Link do GPX', 'Odczucia', 'Trener'])
-
-        for training in athlete_trainings:
-            writer.writerow([
-                training.date,
-                training.training_type.training_type if training.training_type else 'Brak',
-                training.training_description if training.training_description else '',
-                training.gpx_url if training.gpx_url else '',
-                training.feeling if training.feeling else '',
-                training.coach.get_full_name() if training.coach else 'Brak'
-            ])
-
-        return response
+        return training_csv_response(athlete_trainings, filename)
 
     def post(self, request):
         action = request.POST.get('action')
         gpx_url = request.POST.get("gpx_url")
-        age = int(request.POST.get("age", 0))
+        try:
+            age = int(request.POST.get("age") or 0)
+        except ValueError:
+            age = 0
         training_type_id = request.POST.get("training_type")
         feeling_number = request.POST.get("feeling_number")
         feeling_choices = {
@@ -194,64 +272,44 @@ class ZawodnikView(View):
             '6': 'Perfekcyjnie'
         }
         selected_feeling = feeling_choices.get(feeling_number, 'neutral')
-        available_training_types = TrainingType.objects.all()
-        available_coaches = User.objects.filter(role='coach')
-        athlete_trainings = Training.objects.filter(competitor=request.user).order_by('-date')
+        available_training_types = training_types()
+        available_coaches = coaches()
+        athlete_trainings = with_job_status(
+            Training.objects.filter(competitor=request.user).select_related('training_type', 'coach', 'metrics')
+        ).order_by('-date', '-id')
+        state = list_state(request, ())
 
         if action == 'load':
-            response = requests.get(gpx_url)
-            if response.status_code == 200:
-                gpx_data = response.content
-                root = ET.fromstring(gpx_data)
-                namespaces = {
-                    'gpx': 'http://www.topografix.com/GPX/1/1',
-                    'gpxtpx': 'http://www.garmin.com/xmlschemas/TrackPointExtension/v1'
-                }
-                heart_rates = []
-                for trkpt in root.findall('.//gpx:trkpt', namespaces):
-                    hr = trkpt.find('.//gpxtpx:hr', namespaces)
-                    if hr is not None:
-                        heart_rates.append(int(hr.text))
-
-                avg_hr = round(sum(heart_rates) / len(heart_rates)) if heart_rates else 0
-                actual_max_hr = max(heart_rates) if heart_rates else 0
+            # 'load' to podgląd, na który użytkownik i tak czeka - odpowiedzią jest sama analiza,
+            # więc zostaje w żądaniu. Pobranie idzie przez GpxCache (zapis po 'load' nie pobiera
+            # pliku ponownie), a przy GPX_ASYNC_VIEWS odbywa się bez blokowania wątku (ZawodnikAsyncView).
+            gpx_path = self.fetch_gpx(gpx_url)
+            if gpx_path is not None:
+                samples = parse_gpx(gpx_path)
+                heart_rates = samples['hr']
+
+                avg_hr = round(float(heart_rates.mean())) if heart_rates.size else 0
+                actual_max_hr = int(heart_rates.max()) if heart_rates.size else 0
                 request.session['avg_hr'] = avg_hr
                 request.session['actual_max_hr'] = actual_max_hr
-                request.session['heart_rates'] = heart_rates
+                discard_analysis(request.session.get('analysis_token'))
+                request.session['analysis_token'] = store_analysis(gpx_url, samples, gpx_path.stem, age)
                 request.session['age'] = age
 
-                time_indices = np.arange(len(heart_rates)) / 60
-                max_hr = max(heart_rates) if heart_rates else 0
-                min_hr = min(heart_rates) if heart_rates else 0
-
-                y_range = Range1d(start=min_hr, end=max_hr)
-                plot_line = figure(title='Tętno w czasie z podziałem na strefy', x_axis_label='Czas[min]', y_axis_label='Tętno [bpm]',
-                                   sizing_mode='stretch_width', height=400, y_range=y_range)
-                
-                hover = HoverTool(
-                    tooltips=[
-                        ("Czas", "$x{0.2f} min"),
-                        ("Tętno", "$y bpm"),
-                    ],
-                    mode='vline'
-                )
-                plot_line.add_tools(hover)
-
-                theoretical_max_hr = 200
-                start_index = 0
-                colors = ['blue', 'green', '#FFD700', 'orange', 'red']
-                zones_boundaries = [theoretical_max_hr * 0.6, theoretical_max_hr * 0.7, theoretical_max_hr * 0.8, theoretical_max_hr * 0.9]
-                for i, hr in enumerate(heart_rates):
-                    zone = next((z for z, boundary in enumerate(zones_boundaries) if hr < boundary), len(zones_boundaries) - 1)
-                    if i + 1 == len(heart_rates) or zone != next((z for z, boundary in enumerate(zones_boundaries) if heart_rates[i + 1] < boundary), len(zones_boundaries) - 1):
-                        plot_line.line(time_indices[start_index:i + 1], heart_rates[start_index:i + 1], line_width=2, color=colors[zone])
-                        start_index = i + 1
-
-                script_line, div_line = components(plot_line)
-
-                zone_times = calculate_time_in_zones(heart_rates, zones_boundaries)
-                plot_bar = create_zone_time_chart(zone_times, zones_boundaries)
-                script_bar, div_bar = components(plot_bar)
+                max_hr = actual_max_hr
+
+                # podany wiek (220 - wiek) dotyczy tylko tego podglądu i działa, dopóki zawodnik nie ma
+                # własnego profilu stref; profile zakłada się w panelu admina (ZoneProfileAdmin)
+                zones_boundaries = get_zones_boundaries(request.user.pk, age)
+                classification = classify_zones(heart_rates, zones_boundaries)
+                with profile_section('bokeh'):
+                    plot_line = create_hr_line_chart(heart_rates, classification)
+                    script_line, div_line = components(plot_line)
+
+                zone_times = classification.counts.tolist()
+                with profile_section('bokeh'):
+                    plot_bar = create_zone_time_chart(zone_times)
+                    script_bar, div_bar = components(plot_bar)
 
                 context = {
                     'max_hr': max_hr,
@@ -265,35 +323,32 @@ class ZawodnikView(View):
                     'zones_boundaries': zones_boundaries,
                     'cdn_js': CDN.js_files,
                     'cdn_css': CDN.css_files,
-                    'coach': User.objects.get(pk=request.POST.get('coach')) if request.POST.get('coach') else None,
+                    'coach': get_coach(request.POST.get('coach')),
                     'competitor': request.user,
                     'date': request.POST.get("training_date"),
                     'comment': request.POST.get("training_comment"),
                     'gpx_url': gpx_url,
                     'feeling_number': feeling_number,
-                    'available_training_types': TrainingType.objects.all(),
-                    'available_coaches': User.objects.filter(role='coach'),
-                    'athlete_trainings': athlete_trainings,
+                    'age': age or '',
+                    'available_training_types': available_training_types,
+                    'available_coaches': available_coaches,
+                    'athlete_trainings': keyset_page(athlete_trainings, state),
+                    'per_page': state['per_page'],
+                    'page_size_choices': settings.TRAINING_PAGE_SIZE_CHOICES,
                 }
-                if training_type_id:
-                    context['training_type'] = TrainingType.objects.get(pk=training_type_id).training_type
-                
-                paginator = Paginator(athlete_trainings, 5)  
-                page_number = request.GET.get('page', 1)
-                page_obj = paginator.get_page(page_number)
-                context.update({
-                    'athlete_trainings': page_obj,
-                })
+                training_type = get_training_type(training_type_id)
+                if training_type is not None:
+                    context['training_type'] = training_type.training_type
+
                 return render(request, 'zawodnik.html', context)
 
         elif action == 'save':
             competitor = request.user
-            training_type_instance = TrainingType.objects.get(pk=training_type_id) if training_type_id else None
-            coach_id = request.POST.get('coach', None)
-            coach_instance = User.objects.get(pk=coach_id) if coach_id else None
+            training_type_instance = get_training_type(training_type_id)
+            coach_instance = get_coach(request.POST.get('coach'))
             
 
-            Training.objects.create(
+            training = Training.objects.create(
                 training_type=training_type_instance,
                 date=request.POST.get("training_date"),
                 training_description=request.POST.get("training_comment"),
@@ -302,33 +357,46 @@ class ZawodnikView(View):
                 gpx_url=gpx_url,
                 feeling=selected_feeling
             )
+            # dane wczytane wcześniej akcją 'load' nie są pobierane ponownie
+            analysis_token = request.session.pop('analysis_token', None)
+            analysis = load_analysis(analysis_token, gpx_url)
+            discard_analysis(analysis_token)
+            if analysis is not None:
+                if analysis.get('content_hash'):
+                    save_training_samples(training, analysis['samples'], analysis['content_hash'])
+                # strefy jak w podglądzie (profil albo podany wiek); profil czytany z bazy, bo zmiana
+                # profilu przelicza już zapisane treningi, a ten mógłby dostać kopię sprzed zmiany
+                zones_boundaries = current_zones_boundaries(competitor.pk, analysis.get('age'))
+                save_training_metrics(training, analysis['samples'], zones_boundaries)
+            elif gpx_url:
+                # pobranie i analiza pliku odbywa się poza żądaniem (run_gpx_jobs)
+                enqueue_gpx_job(training)
             return redirect('zawodnik') 
 
         context = {
             'available_training_types': available_training_types,
             'available_coaches': available_coaches,
-            'athlete_trainings': athlete_trainings,
+            'athlete_trainings': keyset_page(athlete_trainings, state),
             'competitor': request.user,  
+            'per_page': state['per_page'],
+            'page_size_choices': settings.TRAINING_PAGE_SIZE_CHOICES,
         }
 
-        paginator = Paginator(athlete_trainings, 5)  
-        page_number = request.GET.get('page', 1)
-        page_obj = paginator.get_page(page_number)
-        context.update({
-            'athlete_trainings': page_obj,
-        })
-
         return render(request, 'zawodnik.html', context)
 
 class TrenerView(View):
     def get(self, request):
         coach = request.user
-        date_from = request.GET.get('date_from')
-        date_to = request.GET.get('date_to')
-        training_type_filter = request.GET.get('training_type_filter')
-        competitor_filter = request.GET.get('competitor_filter')
+        state = list_state(request, ('date_from', 'date_to', 'training_type_filter', 'competitor_filter', 'q'))
+        date_from = state['filters'].get('date_from')
+        date_to = state['filters'].get('date_to')
+        training_type_filter = state['filters'].get('training_type_filter')
+        competitor_filter = state['filters'].get('competitor_filter')
+        search_query = (state['filters'].get('q') or '').strip()
 
-        trainings = Training.objects.filter(coach=coach).order_by('-date')
+        trainings = with_job_status(
+            Training.objects.filter(coach=coach).select_related('training_type', 'competitor', 'metrics')
+        ).order_by('-date', '-id')
 
         if date_from and date_from.lower() != 'none':
             trainings = trainings.filter(date__gte=date_from)
@@ -339,9 +407,8 @@ class TrenerView(View):
         if competitor_filter and competitor_filter.lower() != 'none':
             trainings = trainings.filter(competitor_id=competitor_filter)
 
-        paginator = Paginator(trainings, 5)  
-        page_number = request.GET.get('page', 1)
-        page_obj = paginator.get_page(page_number)
+        if 'download_csv' in request.GET:
+            return self.generate_csv_report(trainings, training_type_filter, date_from, date_to, competitor_filter)
 
         available_competitors = User.objects.filter(
             role='competitor',
@@ -349,19 +416,28 @@ class TrenerView(View):
         ).distinct()
 
         context = {
-            'trainings': page_obj,
+            'trainings': self.training_page(trainings, state, search_query),
             'date_from': date_from,
             'date_to': date_to,
             'training_type_filter': training_type_filter,
             'competitor_filter': competitor_filter,
-            'available_training_types': TrainingType.objects.all(),
-            'available_competitors': available_competitors
+            'search_query': search_query,
+            'available_training_types': training_types(),
+            'available_competitors': available_competitors,
+            'per_page': state['per_page'],
+            'show_count': state['count'],
+            'page_size_choices': settings.TRAINING_PAGE_SIZE_CHOICES,
         }
-        if 'download_csv' in request.GET:
-            return self.generate_csv_report(trainings, training_type_filter, date_from, date_to, competitor_filter)
 
         return render(request, 'trener.html', context)
 
+    def training_page(self, trainings, state, search_query):
+        if not search_query:
+            return keyset_page(trainings, state)
+        # wyniki wyszukiwania są uporządkowane trafnością, więc pokazujemy jedną listę najlepszych dopasowań
+        results = search_trainings(trainings, search_query, settings.TRAINING_SEARCH_LIMIT)
+        return KeysetPage(results, state, has_previous=False, has_next=False)
+
     def post(self, request):
         training_id = request.POST.get('training_id')
         coach_comment = request.POST.get('coach_comment')
@@ -371,9 +447,7 @@ class TrenerView(View):
         return redirect('trener')
     
     def generate_csv_report(self, trainings, training_type_filter, date_from, date_to, competitor_filter):
-        response = HttpResponse(content_type='text/csv; charset=utf-8') 
         filename = 'training_report_'
-        response.write('\ufeff'.encode('utf8'))
 
         # Dodaj imię i nazwisko zawodnika do nazwy pliku
         if competitor_filter and competitor_filter.lower() != 'none':
@@ -385,32 +459,23 @@ class TrenerView(View):
         if (date_from and date_from.lower() != 'none') and (date_to and date_to.lower() != 'none'):
             filename += f'{date_from}_{date_to}.csv'
         else:
-            min_date = trainings.aggregate(Min('date'))['date__min']
-            max_date = trainings.aggregate(Max('date'))['date__max']
-            if not date_from or date_from.lower() == 'none':
-                date_from = min_date
-            if not date_to or date_to.lower() == 'none':
-                date_to = max_date
             filename += 'all.csv'
 
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return training_csv_response(trainings, filename)
+    
+class TrenerDashboardView(View):
+    """Podsumowanie tygodniowe zawodników trenera; ``?format=json`` zwraca same dane."""
 
-        writer = csv.writer(response,delimiter=';')
-        writer.writerow(['Data', 'Rodzaj treningu', 'Opis', 'Link do GPX', 'Odczucia', 'Trener'])
+    def get(self, request):
+        date_from = parse_date_filter(request.GET.get('date_from'))
+        date_to = parse_date_filter(request.GET.get('date_to'))
+        dashboard = coach_dashboard(request.user, date_from, date_to)
 
-        for training in trainings:
-            writer.writerow([
-                training.date,
-                training.training_type.training_type if training.training_type else 'Brak',
-                training.training_description if training.training_description else '',
-                training.gpx_url if training.gpx_url else '',
-                training.feeling if training.feeling else '',
-                training.coach.get_full_name() if training.coach else 'Brak'
-            ])
+        if request.GET.get('format') == 'json':
+            return JsonResponse(dashboard)
+        return render(request, 'trener_dashboard.html', {'dashboard': dashboard})
 
-        return response
-    
-class TrenerTrainingDetailView(View):
+class TrenerTrainingDetailView(GpxFetchMixin, View):
     def get(self, request, pk):
         return self.render_training_detail(request, pk)
 
@@ -423,65 +488,32 @@ class TrenerTrainingDetailView(View):
         return self.render_training_detail(request, pk)
 
     def render_training_detail(self, request, pk):
-        training = get_object_or_404(Training, pk=pk)
-        response = requests.get(training.gpx_url)
-        if response.status_code == 200:
-            gpx_data = response.content
-            root = ET.fromstring(gpx_data)
-            namespaces = {
-                'gpx': 'http://www.topografix.com/GPX/1/1',
-                'gpxtpx': 'http://www.garmin.com/xmlschemas/TrackPointExtension/v1'
+        training = get_object_or_404(Training.objects.select_related('metrics'), pk=pk)
+        if settings.HR_CHARTS_CLIENT_SIDE:
+            # strona wraca od razu, dane wykresów pobiera przeglądarka z TrainingChartDataView
+            metrics = getattr(training, 'metrics', None)
+            context = {
+                'training': training,
+                'chart_data_url': reverse('training_chart_data', args=[training.pk]),
+                'actual_max_hr': metrics.max_hr if metrics is not None else '-',
+                'avg_hr': metrics.avg_hr if metrics is not None else '-',
+                'cdn_js': BOKEH_API_JS,
+                'cdn_css': CDN.css_files,
             }
-            heart_rates = []
-            for trkpt in root.findall('.//gpx:trkpt', namespaces):
-                hr = trkpt.find('.//gpxtpx:hr', namespaces)
-                if hr is not None:
-                    heart_rates.append(int(hr.text))
-
-            avg_hr = round(sum(heart_rates) / len(heart_rates)) if heart_rates else 0
-            actual_max_hr = max(heart_rates) if heart_rates else 0
-
-            time_indices = np.arange(len(heart_rates)) / 60
-            max_hr = max(heart_rates) if heart_rates else 0
-            min_hr = min(heart_rates) if heart_rates else 0
-
-            y_range = Range1d(start=min_hr, end=max_hr)
-            plot_line = figure(title='Tętno w czasie z podziałem na strefy', x_axis_label='Czas[min]', y_axis_label='Tętno [bpm]',
-                               sizing_mode='stretch_width', height=400, y_range=y_range)
-            hover = HoverTool(
-            tooltips=[
-                ("Czas", "$x{0.2f} min"),
-                ("Tętno", "$y bpm"),
-            ],
-            mode='vline'
-            )
-            plot_line.add_tools(hover)
-
-            theoretical_max_hr = 200
-            start_index = 0
-            colors = ['blue', 'green', '#FFD700', 'orange', 'red']
-            zones_boundaries = [theoretical_max_hr * 0.6, theoretical_max_hr * 0.7, theoretical_max_hr * 0.8, theoretical_max_hr * 0.9]
-            for i, hr in enumerate(heart_rates):
-                zone = next((z for z, boundary in enumerate(zones_boundaries) if hr < boundary), len(zones_boundaries) - 1)
-                if i + 1 == len(heart_rates) or zone != next((z for z, boundary in enumerate(zones_boundaries) if heart_rates[i + 1] < boundary), len(zones_boundaries) - 1):
-                    plot_line.line(time_indices[start_index:i + 1], heart_rates[start_index:i + 1], line_width=2, color=colors[zone])
-                    start_index = i + 1
+            return render(request, 'trener_training_detail.html', context)
 
-            script_line, div_line = components(plot_line)
-
-            zone_times = self.calculate_time_in_zones(heart_rates, zones_boundaries)
-            plot_bar = self.create_zone_time_chart(zone_times, zones_boundaries)
-            script_bar, div_bar = components(plot_bar)
+        content_hash, load_samples = self.training_samples_source(training)
+        if content_hash is not None:
+            zones_boundaries = get_zones_boundaries(training.competitor_id)
+            # klucz zawiera hash treści GPX, więc zmiana pliku lub stref zmienia klucz
+            cache_key = chart_cache_key(training.pk, content_hash, zones_boundaries)
+            charts = get_cached_charts(cache_key)
+            if charts is None:
+                charts = self.build_charts(training, load_samples(), zones_boundaries)
+                set_cached_charts(cache_key, charts)
 
             context = {
-                'max_hr': max_hr,
-                'avg_hr': avg_hr,
-                'actual_max_hr': actual_max_hr,
-                'script_line': script_line,
-                'div_line': div_line,
-                'script_bar': script_bar,
-                'div_bar': div_bar,
-                'zone_times': zone_times,
+                **charts,
                 'zones_boundaries': zones_boundaries,
                 'training': training,
                 'cdn_js': CDN.js_files,
@@ -492,40 +524,150 @@ class TrenerTrainingDetailView(View):
 
         return redirect('trener')
 
-    def calculate_time_in_zones(self, heart_rates, zones_boundaries):
-        zone_times = [0] * (len(zones_boundaries) + 1)
-        for hr in heart_rates:
-            for i, boundary in enumerate(zones_boundaries):
-                if hr < boundary:
-                    zone_times[i] += 1
-                    break
-            else:
-                zone_times[-1] += 1
-        return zone_times
-
-    def create_zone_time_chart(self, zone_times, zones_boundaries):
-        colors = ['blue', 'green', '#FFD700', 'orange', 'red', 'purple']
-        zone_labels = ['1', '2', '3', '4', '5']
-        zone_times_in_minutes = [time / 60 for time in zone_times]
-        source = ColumnDataSource(data=dict(zones=zone_labels, times=zone_times_in_minutes, colors=colors))
-
-        p = figure(x_range=zone_labels, title="Czas spędzony w strefach tętna", height=400,sizing_mode='stretch_width', toolbar_location=None, tools="")
-        p.vbar(x='zones', top='times', width=0.9, color='colors', source=source)
-        hover = HoverTool(
-            tooltips=[
-                ("Strefa", "@zones"),
-                ("Czas", "@times min"),
-            ]
+    def build_charts(self, training, samples, zones_boundaries):
+        metrics = getattr(training, 'metrics', None)
+        heart_rates = samples['hr']
+
+        if metrics is not None:
+            avg_hr = metrics.avg_hr
+            actual_max_hr = metrics.max_hr
+        else:
+            avg_hr = round(float(heart_rates.mean())) if heart_rates.size else 0
+            actual_max_hr = int(heart_rates.max()) if heart_rates.size else 0
+
+        classification = classify_zones(heart_rates, zones_boundaries)
+        with profile_section('bokeh'):
+            plot_line = create_hr_line_chart(heart_rates, classification)
+            script_line, div_line = components(plot_line)
+
+        zone_times = metrics.zone_times_for(zones_boundaries) if metrics is not None else None
+        if zone_times is None:
+            zone_times = classification.counts.tolist()
+        with profile_section('bokeh'):
+            plot_bar = create_zone_time_chart(zone_times, sizing_mode='stretch_width')
+            script_bar, div_bar = components(plot_bar)
+
+        return {
+            'max_hr': actual_max_hr,
+            'avg_hr': avg_hr,
+            'actual_max_hr': actual_max_hr,
+            'script_line': script_line,
+            'div_line': div_line,
+            'script_bar': script_bar,
+            'div_bar': div_bar,
+            'zone_times': zone_times,
+        }
+
+class TrainingChartDataView(GpxFetchMixin, View):
+    """
+    Dane wykresów tętna treningu w formacie JSON. ETag zależy od hashu pliku GPX,
+    granic stref i liczby punktów, więc przeglądarka pobiera dane tylko po zmianie.
+    """
+
+    def get(self, request, pk):
+        training = get_object_or_404(
+            Training.objects.filter(Q(competitor_id=request.user.pk) | Q(coach_id=request.user.pk))
+            .select_related('metrics'),
+            pk=pk,
         )
-        p.add_tools(hover)
+        content_hash, load_samples = self.training_samples_source(training)
+        if content_hash is None:
+            raise Http404
+
+        zones_boundaries = get_zones_boundaries(training.competitor_id)
+        cache_key = chart_data_cache_key(training.pk, content_hash, zones_boundaries)
+        etag = quote_etag(hashlib.sha256(cache_key.encode('utf-8')).hexdigest()[:32])
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            data = get_cached_charts(cache_key)
+            if data is None:
+                data = self.build_data(training, load_samples(), zones_boundaries)
+                set_cached_charts(cache_key, data)
+            response = JsonResponse(data)
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
 
-        p.xgrid.grid_line_color = None
-        p.y_range.start = 0
-        p.xaxis.axis_label = "Strefy tętna"
-        p.yaxis.axis_label = "Czas [s]"
+    def build_data(self, training, samples, zones_boundaries):
+        metrics = getattr(training, 'metrics', None)
+        heart_rates = samples['hr']
+        classification = classify_zones(heart_rates, zones_boundaries)
+
+        if metrics is not None:
+            avg_hr = metrics.avg_hr
+        else:
+            avg_hr = round(float(heart_rates.mean())) if heart_rates.size else 0
+        zone_times = metrics.zone_times_for(zones_boundaries) if metrics is not None else None
+        if zone_times is None:
+            zone_times = classification.counts.tolist()
+
+        data = hr_chart_data(heart_rates, classification, zone_times)
+        data['avg_hr'] = avg_hr
+        data['zones_boundaries'] = zones_boundaries
+        return data
+
+
+class TrainingJobStatusView(View):
+    def get(self, request, pk):
+        job = GpxJob.objects.filter(
+            Q(training__competitor_id=request.user.pk) | Q(training__coach_id=request.user.pk),
+            training_id=pk,
+        ).select_related('training__metrics').order_by('-created_at').first()
+        if job is None:
+            raise Http404
+
+        data = {'status': job.status, 'error': job.error}
+        metrics = getattr(job.training, 'metrics', None)
+        if job.status == 'done' and metrics is not None:
+            data['metrics'] = {
+                'avg_hr': metrics.avg_hr,
+                'max_hr': metrics.max_hr,
+                'duration': metrics.duration,
+                'zone_times': metrics.zone_times,
+            }
+        return JsonResponse(data)
+
+
+@method_decorator(staff_member_required, name='dispatch')
+class ProfilingSummaryView(View):
+    def get(self, request):
+        return JsonResponse({'enabled': settings.REQUEST_PROFILING, 'views': profiling_summary()})
+
+
+class ZawodnikAsyncView(AsyncGpxFetchMixin, ZawodnikView):
+    async def get(self, request):
+        return await sync_to_async(super().get)(request)
+
+    async def post(self, request):
+        # zapis nie pobiera pliku (analiza trafia do kolejki lub korzysta z wyniku 'load')
+        if request.POST.get('action') == 'load':
+            await self.prefetch_gpx(request.POST.get('gpx_url'))
+        return await sync_to_async(super().post)(request)
+
+
+class TrenerTrainingDetailAsyncView(AsyncGpxFetchMixin, TrenerTrainingDetailView):
+    async def get(self, request, pk):
+        await self.prefetch_detail_gpx(pk)
+        return await sync_to_async(super().get)(request, pk)
+
+    async def post(self, request, pk):
+        await self.prefetch_detail_gpx(pk)
+        return await sync_to_async(super().post)(request, pk)
+
+    async def prefetch_detail_gpx(self, pk):
+        # przy wykresach po stronie przeglądarki plik pobiera TrainingChartDataAsyncView
+        if not settings.HR_CHARTS_CLIENT_SIDE:
+            await self.prefetch_training_gpx(Training.objects.filter(pk=pk))
+
+
+class TrainingChartDataAsyncView(AsyncGpxFetchMixin, TrainingChartDataView):
+    async def get(self, request, pk):
+        user_id = await sync_to_async(lambda: request.user.pk)()
+        await self.prefetch_training_gpx(
+            Training.objects.filter(Q(competitor_id=user_id) | Q(coach_id=user_id), pk=pk)
+        )
+        return await sync_to_async(super().get)(request, pk)
 
-        return p
-    
 # class TrainingTypeView(FormView):
 #     template_name = 'zawodnik.html'
 #     form_class = TrainingTypeForm
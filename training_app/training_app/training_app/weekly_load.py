@@ -0,0 +1,113 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncWeek
+
+from .models import Training, WeeklyLoad
+
+ZONE_FIELDS = ['zone1_time', 'zone2_time', 'zone3_time', 'zone4_time', 'zone5_time']
+# obciążenie przewlekłe to średnia z tylu ostatnich tygodni (łącznie z bieżącym)
+CHRONIC_WEEKS = 4
+
+
+def week_start(day):
+    return day - timedelta(days=day.weekday())
+
+
+def trimp(zone_times):
+    """TRIMP wg Edwardsa: suma minut w strefach ważonych numerem strefy (1-5)."""
+    return round(sum(index * seconds / 60 for index, seconds in enumerate(zone_times, start=1)), 1)
+
+
+def weekly_load_rows(trainings):
+    """Treningi z datą zgrupowane po zawodniku i tygodniu, z sumami z ``TrainingMetrics``."""
+    return (
+        trainings.filter(date__isnull=False)
+        .annotate(week=TruncWeek('date'))
+        .values('competitor_id', 'week')
+        .annotate(
+            sessions=Count('id'),
+            duration=Sum('metrics__duration'),
+            **{field: Sum(f'metrics__{field}') for field in ZONE_FIELDS},
+        )
+        .order_by()
+    )
+
+
+def _weekly_load_values(row):
+    values = {'sessions': row['sessions'], 'duration': row['duration'] or 0}
+    values.update((field, row[field] or 0) for field in ZONE_FIELDS)
+    values['trimp'] = trimp([values[field] for field in ZONE_FIELDS])
+    return values
+
+
+def refresh_weekly_load(competitor_id, day):
+    """Przelicza jeden tydzień zawodnika (jedno małe zapytanie po indeksie zawodnik/data)."""
+    if day is None:
+        return
+    week = week_start(day)
+    trainings = Training.objects.filter(
+        competitor_id=competitor_id, date__gte=week, date__lt=week + timedelta(weeks=1),
+    )
+    row = next(iter(weekly_load_rows(trainings)), None)
+    if row is None:
+        WeeklyLoad.objects.filter(competitor_id=competitor_id, week=week).delete()
+        return
+    WeeklyLoad.objects.update_or_create(competitor_id=competitor_id, week=week, defaults=_weekly_load_values(row))
+
+
+def rebuild_weekly_load(batch_size=5000):
+    """Odbudowuje całą tabelę ``WeeklyLoad`` jednym zapytaniem grupującym; zwraca liczbę wierszy."""
+    created = 0
+    with transaction.atomic():
+        WeeklyLoad.objects.all().delete()
+        batch = []
+        for row in weekly_load_rows(Training.objects.all()).iterator():
+            batch.append(WeeklyLoad(competitor_id=row['competitor_id'], week=row['week'], **_weekly_load_values(row)))
+            if len(batch) >= batch_size:
+                WeeklyLoad.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+        WeeklyLoad.objects.bulk_create(batch)
+        created += len(batch)
+    return created
+
+
+def load_trend(competitor_ids, first_week, last_week):
+    """
+    Tygodniowy TRIMP i stosunek obciążenia ostrego do przewlekłego (ACWR) dla
+    zawodników: ``{competitor_id: [{'week', 'trimp', 'acwr'}, ...]}``. Czyta
+    tylko wiersze ``WeeklyLoad`` z podanego zakresu (plus tygodnie potrzebne
+    do średniej przewlekłej).
+    """
+    first_week, last_week = week_start(first_week), week_start(last_week)
+    rows = WeeklyLoad.objects.filter(
+        competitor_id__in=competitor_ids,
+        week__gte=first_week - timedelta(weeks=CHRONIC_WEEKS - 1),
+        week__lte=last_week,
+    ).values_list('competitor_id', 'week', 'trimp')
+    loads = defaultdict(dict)
+    for competitor_id, week, load in rows:
+        loads[competitor_id][week] = load
+
+    weeks = []
+    week = first_week
+    while week <= last_week:
+        weeks.append(week)
+        week += timedelta(weeks=1)
+
+    trend = {}
+    for competitor_id in competitor_ids:
+        by_week = loads.get(competitor_id, {})
+        trend[competitor_id] = []
+        for week in weeks:
+            chronic = sum(by_week.get(week - timedelta(weeks=i), 0) for i in range(CHRONIC_WEEKS)) / CHRONIC_WEEKS
+            acute = by_week.get(week, 0)
+            trend[competitor_id].append({
+                'week': week,
+                'trimp': acute,
+                'acwr': round(acute / chronic, 2) if chronic else None,
+            })
+    return trend
@@ -0,0 +1,68 @@
+import threading
+import time
+
+from django.conf import settings
+
+from .lookups import bump_version, get_version
+from .models import ZoneProfile
+from .zones import default_zones_boundaries, max_hr_from_age
+
+# user_id -> (wersja, czas wczytania, granice stref); każdy proces ma własną kopię
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _version_key(user_id):
+    return f'zone-profile-version:{user_id}'
+
+
+def load_zones_boundaries(user_id):
+    """Granice stref z profilu użytkownika (bez cache) albo ``None``, gdy profilu nie ma."""
+    profile = ZoneProfile.objects.filter(user_id=user_id).first()
+    if profile is None:
+        return None
+    return profile.zones_boundaries()
+
+
+def _with_defaults(zones_boundaries, age):
+    # bez profilu granice wyznacza się z wieku (220 - wiek) albo z teoretycznego tętna maksymalnego
+    if zones_boundaries is not None:
+        return list(zones_boundaries)
+    if age:
+        return default_zones_boundaries(max_hr_from_age(age))
+    return default_zones_boundaries()
+
+
+def get_zones_boundaries(user_id, age=None):
+    """
+    Granice stref zawodnika z cache w pamięci procesu. Wpis jest ważny, dopóki
+    sygnał po zmianie profilu nie podbije wersji w ``LOOKUP_VERSION_CACHE``
+    i nie minie ``ZONE_PROFILE_CACHE_TTL`` sekund. Do wyświetlania; przy zapisie
+    metryk służy ``current_zones_boundaries``.
+    """
+    version = get_version(_version_key(user_id))
+    now = time.monotonic()
+    with _cache_lock:
+        entry = _cache.get(user_id)
+    if entry is not None and entry[0] == version and now - entry[1] < settings.ZONE_PROFILE_CACHE_TTL:
+        zones_boundaries = entry[2]
+    else:
+        zones_boundaries = load_zones_boundaries(user_id)
+        with _cache_lock:
+            _cache[user_id] = (version, now, zones_boundaries)
+    return _with_defaults(zones_boundaries, age)
+
+
+def current_zones_boundaries(user_id, age=None):
+    """
+    Jak ``get_zones_boundaries``, ale profil czytany z bazy. Zapisane metryki
+    przelicza się ponownie tylko po zmianie profilu, więc nie mogą powstać
+    z nieaktualnej kopii z cache.
+    """
+    return _with_defaults(load_zones_boundaries(user_id), age)
+
+
+def invalidate_zones_boundaries(user_id):
+    bump_version(_version_key(user_id))
+    with _cache_lock:
+        _cache.pop(user_id, None)
@@ -0,0 +1,52 @@
+from collections import namedtuple
+
+import numpy as np
+
+from .profiling import profile_section
+
+THEORETICAL_MAX_HR = 200
+ZONE_FRACTIONS = (0.6, 0.7, 0.8, 0.9)
+ZONE_COLORS = ['blue', 'green', '#FFD700', 'orange', 'red']
+
+ZoneClassification = namedtuple('ZoneClassification', ['zones', 'counts', 'run_starts', 'run_ends'])
+
+
+def default_zones_boundaries(max_hr=THEORETICAL_MAX_HR):
+    return [max_hr * fraction for fraction in ZONE_FRACTIONS]
+
+
+def karvonen_zones_boundaries(max_hr, resting_hr):
+    """Granice stref jako procent rezerwy tętna (HRmax - HRspocz) dodany do tętna spoczynkowego."""
+    return [resting_hr + (max_hr - resting_hr) * fraction for fraction in ZONE_FRACTIONS]
+
+
+def max_hr_from_age(age):
+    return 220 - age
+
+
+def format_zones_boundaries(zones_boundaries):
+    """Zapis granic stref używany w kluczach cache i w ``TrainingMetrics.zones_boundaries``."""
+    return ','.join(f'{boundary:g}' for boundary in zones_boundaries)
+
+
+def classify_zones(heart_rates, zones_boundaries):
+    """
+    Przypisuje każdej próbce strefę (0 = poniżej pierwszej granicy) i zwraca
+    liczbę próbek w strefach oraz granice ciągłych odcinków w tej samej strefie
+    (``heart_rates[run_starts[i]:run_ends[i]]``).
+    """
+    with profile_section('numpy'):
+        heart_rates = np.asarray(heart_rates)
+        zones = np.digitize(heart_rates, zones_boundaries).astype(np.uint8)
+        counts = np.bincount(zones, minlength=len(zones_boundaries) + 1)
+        changes = np.flatnonzero(np.diff(zones)) + 1
+        if zones.size:
+            run_starts = np.concatenate(([0], changes))
+            run_ends = np.concatenate((changes, [zones.size]))
+        else:
+            run_starts = run_ends = np.empty(0, dtype=np.intp)
+    return ZoneClassification(zones, counts, run_starts, run_ends)
+
+
+def calculate_time_in_zones(heart_rates, zones_boundaries):
+    return classify_zones(heart_rates, zones_boundaries).counts.tolist()